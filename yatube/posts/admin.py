@@ -1,15 +1,24 @@
 from django.contrib import admin
 
+from . import search
 from .models import Post, Group
 
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'pub_date', 'author')
+    list_display = (
+        'pk', 'text', 'pub_date', 'author', 'image_original_size',
+        'image_size'
+    )
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search.matching(queryset, search_term), False
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
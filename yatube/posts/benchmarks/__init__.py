@@ -0,0 +1,4 @@
+"""Нагрузочные замеры лент: заполнение базы и прогон представлений.
+
+Запуск: ``python manage.py benchmark_posts --size 100k``.
+"""
@@ -0,0 +1,54 @@
+from time import perf_counter
+
+from django.template import engines
+from django.test import RequestFactory
+
+from ..models import Post, User
+from ..paginator import POSTS_PER_PAGE
+from .runner import percentile
+
+INCLUDE_LOOP = (
+    '{% for post in posts %}'
+    '{% include "includes/card_post.html" with post=post owner_marks=True %}'
+    '{% endfor %}'
+)
+RENDER_CARDS = (
+    '{% load post_cards %}{% render_cards posts owner_marks=True %}'
+)
+
+
+def _render_times(template, context, request, repeat):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        template.render(context, request)
+        times.append((perf_counter() - start) * 1000)
+    return times
+
+
+def run(repeat=50):
+    """Сравнивает цикл include и ``{% render_cards %}`` на странице ленты.
+
+    Перед замером проверяет, что оба способа дают одинаковый HTML.
+    """
+    engine = engines['django']
+    include_loop = engine.from_string(INCLUDE_LOOP)
+    render_cards = engine.from_string(RENDER_CARDS)
+    request = RequestFactory().get('/')
+    request.user = User.objects.order_by('pk').first()
+    context = {
+        'posts': list(Post.objects.for_listing()[:POSTS_PER_PAGE]),
+    }
+    expected = include_loop.render(context, request)
+    if render_cards.render(context, request) != expected:
+        raise AssertionError('render_cards и include дают разный HTML')
+    result = {'cards': len(context['posts']), 'bytes': len(expected)}
+    for name, template in (
+        ('include', include_loop), ('render_cards', render_cards)
+    ):
+        times = _render_times(template, context, request, repeat)
+        result[f'{name}_p50_ms'] = percentile(times, 50)
+    result['speedup'] = (
+        result['include_p50_ms'] / result['render_cards_p50_ms']
+    )
+    return result
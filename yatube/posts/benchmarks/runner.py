@@ -0,0 +1,152 @@
+import math
+from contextlib import contextmanager
+from time import perf_counter
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.template.base import Template
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post, User
+from ..paginator import POSTS_PER_PAGE
+
+# Разница меньше этой считается шумом при любом относительном росте.
+NOISE_MS = 0.5
+TIME_METRICS = ('sql_ms', 'template_ms', 'wall_p50_ms', 'wall_p90_ms')
+
+
+class TemplateTimer:
+    def __init__(self):
+        self.total = 0.0
+        self.depth = 0
+
+
+@contextmanager
+def template_timer():
+    """Суммирует время внешних ``Template.render`` (вложенные не в счёт)."""
+    timer = TemplateTimer()
+    original = Template.render
+
+    def render(template, context):
+        timer.depth += 1
+        start = perf_counter()
+        try:
+            return original(template, context)
+        finally:
+            timer.depth -= 1
+            if not timer.depth:
+                timer.total += perf_counter() - start
+
+    Template.render = render
+    try:
+        yield timer
+    finally:
+        Template.render = original
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def measure(client, url, repeat, warm=False):
+    samples = []
+    for _ in range(repeat):
+        if not warm:
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries, \
+                template_timer() as timer:
+            start = perf_counter()
+            response = client.get(url)
+            wall = perf_counter() - start
+        if response.status_code != 200:
+            raise RuntimeError(f'{url}: ответ {response.status_code}')
+        samples.append({
+            'queries': len(queries),
+            'sql': sum(float(query['time']) for query in queries),
+            'template': timer.total,
+            'wall': wall,
+        })
+    walls = [sample['wall'] * 1000 for sample in samples]
+    return {
+        'url': url,
+        'repeat': repeat,
+        'queries': max(sample['queries'] for sample in samples),
+        'sql_ms': percentile([s['sql'] * 1000 for s in samples], 50),
+        'template_ms': percentile(
+            [s['template'] * 1000 for s in samples], 50
+        ),
+        'wall_p50_ms': percentile(walls, 50),
+        'wall_p90_ms': percentile(walls, 90),
+        'wall_p99_ms': percentile(walls, 99),
+        'wall_max_ms': max(walls),
+    }
+
+
+def targets():
+    """Самые тяжёлые адреса каждого представления на текущих данных."""
+    viewer = User.objects.annotate(
+        follows=Count('follower')
+    ).order_by('-follows').first()
+    author = User.objects.annotate(
+        post_count=Count('posts')
+    ).order_by('-post_count').first()
+    group = Group.objects.annotate(
+        post_count=Count('posts')
+    ).order_by('-post_count').first()
+    post = Post.objects.annotate(
+        comment_count=Count('comments')
+    ).order_by('-comment_count').select_related('author').first()
+    last_page = max(1, math.ceil(Post.objects.count() / POSTS_PER_PAGE))
+    urls = {
+        'index': reverse('index'),
+        'index_deep': reverse('index') + f'?page={last_page}',
+        'follow_index': reverse('follow_index'),
+    }
+    if group is not None:
+        urls['group_posts'] = reverse('group_posts', args=[group.slug])
+    if author is not None:
+        urls['profile'] = reverse('profile', args=[author.username])
+    if post is not None:
+        urls['post_view'] = reverse(
+            'post_view', args=[post.author.username, post.pk]
+        )
+    return viewer, urls
+
+
+def run(repeat=20, warm=False):
+    viewer, urls = targets()
+    client = Client()
+    client.force_login(viewer)
+    return {
+        name: measure(client, url, repeat, warm)
+        for name, url in urls.items()
+    }
+
+
+def compare(report, baseline, threshold=0.2):
+    """Список регрессий отчёта относительно сохранённого базового."""
+    regressions = []
+    for view, old in baseline['views'].items():
+        new = report['views'].get(view)
+        if new is None:
+            continue
+        if new['queries'] > old['queries']:
+            regressions.append(
+                f"{view}: запросов {old['queries']} -> {new['queries']}"
+            )
+        for metric in TIME_METRICS:
+            if (
+                new[metric] > old[metric] * (1 + threshold)
+                and new[metric] - old[metric] > NOISE_MS
+            ):
+                regressions.append(
+                    f'{view}: {metric} {old[metric]:.2f} -> '
+                    f'{new[metric]:.2f}'
+                )
+    return regressions
@@ -0,0 +1,122 @@
+import random
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from ..bulk import explicit_timestamps, rebuild_derived
+from ..models import Comment, Follow, Group, Post, User
+
+SIZES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+BATCH_SIZE = 5000
+USERNAME_PREFIX = 'bench'
+WORDS = (
+    'котики собаки лето зима город море горы книга кино музыка код '
+    'django python база запрос кэш лента друзья новости погода'
+).split()
+
+
+def pareto(rng, mean, alpha=1.5):
+    """Целое с тяжёлым хвостом: у большинства мало, у единиц очень много."""
+    return int(rng.paretovariate(alpha) * mean * (alpha - 1) / alpha)
+
+
+def _batched(model, objects, **kwargs):
+    """bulk_create кусками, не собирая весь генератор в памяти.
+
+    Размер пачки INSERT внутри куска Django выбирает сам под лимиты SQLite.
+    """
+    objects = iter(objects)
+    while True:
+        chunk = list(islice(objects, BATCH_SIZE))
+        if not chunk:
+            return
+        model.objects.bulk_create(chunk, **kwargs)
+
+
+def seed(posts, users=None, groups=None, follows=20, comments=3,
+         random_seed=0):
+    """Заполняет базу синтетическими данными заданного размера.
+
+    Популярность авторов распределена по Ципфу, число подписок и
+    комментариев - по Парето. Производные таблицы (счётчики, ленты,
+    поисковый индекс) пересобираются в конце.
+    """
+    rng = random.Random(random_seed)
+    users = users or max(10, posts // 20)
+    groups = groups or max(1, posts // 1000)
+    now = timezone.now()
+
+    password = make_password(None)
+    _batched(User, (
+        User(username=f'{USERNAME_PREFIX}{number}', password=password)
+        for number in range(users)
+    ))
+    _batched(Group, (
+        Group(title=f'Группа {number}', slug=f'{USERNAME_PREFIX}-{number}')
+        for number in range(groups)
+    ))
+    user_ids = list(User.objects.filter(
+        username__startswith=USERNAME_PREFIX
+    ).values_list('pk', flat=True))
+    group_ids = list(Group.objects.filter(
+        slug__startswith=USERNAME_PREFIX
+    ).values_list('pk', flat=True))
+    popularity = [1 / rank for rank in range(1, len(user_ids) + 1)]
+
+    with explicit_timestamps(Post):
+        _batched(Post, (
+            Post(
+                text=' '.join(rng.choices(WORDS, k=rng.randint(5, 40))),
+                author_id=author_id,
+                group_id=rng.choice(group_ids) if rng.random() < 0.5 else None,
+                pub_date=now - timedelta(seconds=rng.randrange(365 * 86400)),
+            )
+            for author_id in rng.choices(user_ids, popularity, k=posts)
+        ))
+
+    def follow_rows():
+        for user_id in user_ids:
+            count = min(pareto(rng, follows), len(user_ids) - 1)
+            authors = set(rng.choices(user_ids, popularity, k=count))
+            authors.discard(user_id)
+            for author_id in authors:
+                yield Follow(user_id=user_id, author_id=author_id)
+
+    _batched(Follow, follow_rows(), ignore_conflicts=True)
+
+    def comment_rows():
+        posts = Post.objects.filter(
+            author__username__startswith=USERNAME_PREFIX
+        ).values_list('pk', 'pub_date')
+        for post_id, pub_date in posts.iterator():
+            for _ in range(pareto(rng, comments)):
+                yield Comment(
+                    post_id=post_id,
+                    author_id=rng.choice(user_ids),
+                    text=' '.join(rng.choices(WORDS, k=rng.randint(1, 10))),
+                    created=pub_date + timedelta(
+                        seconds=rng.randrange(7 * 86400)
+                    ),
+                )
+
+    with explicit_timestamps(Comment):
+        _batched(Comment, comment_rows())
+
+    rebuild_derived()
+    return dataset()
+
+
+def dataset():
+    return {
+        'users': User.objects.count(),
+        'groups': Group.objects.count(),
+        'posts': Post.objects.count(),
+        'follows': Follow.objects.count(),
+        'comments': Comment.objects.count(),
+    }
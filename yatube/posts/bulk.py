@@ -0,0 +1,35 @@
+from contextlib import contextmanager
+
+from django.core.cache import cache as default_cache
+
+from . import search, stats, timeline
+
+
+@contextmanager
+def explicit_timestamps(model):
+    """Даёт ``bulk_create`` сохранить заданные pub_date/created.
+
+    На время блока у полей модели снимается ``auto_now_add``; годится
+    только для команд управления, не для кода запросов.
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def rebuild_derived():
+    """Пересобирает всё, что сигналы ведут при обычной записи."""
+    stats.rebuild()
+    timeline.rebuild()
+    search.rebuild_index()
+    # Массовая запись не сбрасывала тегов групп, авторов и постов, а всё
+    # в кэше - производные данные: проще начать с пустого.
+    default_cache.clear()
@@ -0,0 +1,36 @@
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = 'posts:version:%s'
+
+
+def _fresh_version():
+    # После вытеснения ключа версия начинается с текущего времени, а не
+    # с единицы, чтобы не совпасть со старыми фрагментами в кэше.
+    return time.time_ns()
+
+
+def versions(*tags):
+    """Текущие версии тегов одним обращением к кэшу."""
+    keys = [VERSION_KEY % tag for tag in tags]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _fresh_version(), timeout=None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def version(tag):
+    return versions(tag)[0]
+
+
+def bump(*tags):
+    """Инвалидирует всё, что закэшировано под версиями этих тегов."""
+    for tag in tags:
+        key = VERSION_KEY % tag
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _fresh_version(), timeout=None)
@@ -0,0 +1,123 @@
+"""ETag для условных GET-запросов к лентам и странице поста.
+
+Валидатор собирается из самой свежей даты (один шаг по индексу) и
+закэшированного числа объектов, от которых зависит страница, версий
+тегов кэша и того, кто смотрит. Правка поста не двигает ни дат, ни счётчиков,
+поэтому без версии ``feed``, которую сигналы сбрасывают при каждой
+записи поста или комментария, обойтись нельзя - по той же причине
+нет и Last-Modified: по одной дате правку не заметить.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db.models import Max
+
+from . import cache
+from .models import Comment, Group, Post, Timeline, User, UserStats
+from .paginator import cached_count
+
+
+def _etag(request, *parts):
+    user = request.user
+    viewer = (
+        user.pk if user.is_authenticated else None,
+        # Страница хранит CSRF-токен для форм: при новом cookie
+        # закэшированная браузером копия уже не годится.
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+    )
+    raw = repr(parts + viewer).encode()
+    return hashlib.md5(raw).hexdigest()
+
+
+def _latest(queryset, date_field, count_tags=None):
+    latest = queryset.order_by().aggregate(latest=Max(date_field))['latest']
+    if count_tags is None:
+        return (latest,)
+    return latest, cached_count(queryset, count_tags)
+
+
+def _author_stats(author_id):
+    return tuple(
+        UserStats.objects.filter(user_id=author_id)
+        .values_list('followers', 'following', 'posts')
+        .first() or ()
+    )
+
+
+def index_etag(request):
+    return _etag(
+        request,
+        _latest(Post.objects.all(), 'pub_date', ['feed']),
+        cache.version('feed'),
+    )
+
+
+def trending_etag(request):
+    return _etag(request, *cache.versions('feed', 'trending'))
+
+
+def group_etag(request, slug):
+    group_id = (
+        Group.objects.filter(slug=slug).values_list('pk', flat=True).first()
+    )
+    if group_id is None:
+        return None
+    return _etag(
+        request,
+        group_id,
+        _latest(
+            Post.objects.filter(group_id=group_id), 'pub_date',
+            [f'group:{group_id}']
+        ),
+        cache.version('feed'),
+    )
+
+
+def profile_etag(request, username):
+    author_id = (
+        User.objects.filter(username=username)
+        .values_list('pk', flat=True).first()
+    )
+    if author_id is None:
+        return None
+    versions = ['feed']
+    if request.user.is_authenticated:
+        versions += [f'follow:{request.user.pk}', 'recommendations']
+    return _etag(
+        request,
+        author_id,
+        _latest(Post.objects.filter(author_id=author_id), 'pub_date'),
+        _author_stats(author_id),
+        *cache.versions(*versions),
+    )
+
+
+def post_etag(request, username, post_id):
+    author_id = (
+        Post.objects.filter(id=post_id, author__username=username)
+        .values_list('author_id', flat=True).order_by('pk').first()
+    )
+    if author_id is None:
+        return None
+    return _etag(
+        request,
+        post_id,
+        _latest(
+            Comment.objects.filter(post_id=post_id), 'created',
+            [f'post:{post_id}']
+        ),
+        _author_stats(author_id),
+        cache.version('feed'),
+    )
+
+
+def follow_etag(request):
+    user = request.user
+    return _etag(
+        request,
+        _latest(
+            Timeline.objects.filter(user=user), 'pub_date',
+            ['feed', f'follow:{user.pk}']
+        ),
+        *cache.versions('feed', f'follow:{user.pk}', 'recommendations'),
+    )
@@ -0,0 +1,239 @@
+import gzip
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, Post
+
+CHUNK_SIZE = 10000
+MANIFEST = 'manifest.json'
+
+# Столбцы названы так же, как поля входа import_content: выгрузку можно
+# загрузить обратно в другую базу.
+Table = namedtuple('Table', 'model columns date_field')
+
+TABLES = {
+    'groups': Table(Group, (
+        ('slug', 'slug'),
+        ('title', 'title'),
+        ('description', 'description'),
+    ), None),
+    'posts': Table(Post, (
+        ('author', 'author__username'),
+        ('group', 'group__slug'),
+        ('text', 'text'),
+        ('image', 'image'),
+        ('pub_date', 'pub_date'),
+    ), 'pub_date'),
+    'comments': Table(Comment, (
+        ('post', 'post_id'),
+        ('author', 'author__username'),
+        ('text', 'text'),
+        ('created', 'created'),
+    ), 'created'),
+    'follows': Table(Follow, (
+        ('user', 'user__username'),
+        ('author', 'author__username'),
+    ), None),
+}
+FORMATS = ('ndjson', 'columnar')
+
+
+def iter_chunks(queryset, lookups, chunk_size=CHUNK_SIZE):
+    """Кортежи ``(pk, *lookups)`` порциями по первичному ключу.
+
+    Каждая порция - ``WHERE pk > последний ORDER BY pk LIMIT n``, без
+    OFFSET и без курсора, держащего транзакцию всю выгрузку.
+    """
+    queryset = queryset.order_by('pk').values_list('pk', *lookups)
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        rows = list(page[:chunk_size])
+        if not rows:
+            return
+        last = rows[-1][0]
+        yield rows
+
+
+def _plain(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class NDJSONWriter:
+    """Вся таблица - один ``<table>.ndjson.gz``, строка на объект."""
+
+    def __init__(self, directory, name):
+        self.name = f'{name}.ndjson.gz'
+        self.file = gzip.open(
+            os.path.join(directory, self.name), 'wt', encoding='utf-8'
+        )
+
+    def write(self, columns, rows):
+        for row in rows:
+            self.file.write(json.dumps(
+                dict(zip(columns, map(_plain, row))), ensure_ascii=False
+            ))
+            self.file.write('\n')
+
+    def close(self):
+        self.file.close()
+        return [self.name]
+
+
+class ColumnarWriter:
+    """Каждая порция - ``<table>/part-NNNNN.json.gz`` со списками столбцов.
+
+    Раскладка как у Parquet по частям: аналитике удобно читать столбец
+    целиком, а части можно обрабатывать параллельно.
+    """
+
+    def __init__(self, directory, name):
+        self.directory = directory
+        self.name = name
+        self.files = []
+        os.makedirs(os.path.join(directory, name), exist_ok=True)
+
+    def write(self, columns, rows):
+        part = f'{self.name}/part-{len(self.files):05d}.json.gz'
+        data = {
+            column: [_plain(value) for value in values]
+            for column, values in zip(columns, zip(*rows))
+        }
+        with gzip.open(
+            os.path.join(self.directory, part), 'wt', encoding='utf-8'
+        ) as target:
+            json.dump(data, target, ensure_ascii=False)
+        self.files.append(part)
+
+    def close(self):
+        return self.files
+
+
+WRITERS = {'ndjson': NDJSONWriter, 'columnar': ColumnarWriter}
+
+
+def export_table(name, directory, format='ndjson', since=None,
+                 after_id=None, since_id=None, chunk_size=CHUNK_SIZE):
+    """Выгружает одну таблицу и возвращает её запись для манифеста.
+
+    ``since`` отбирает строки не старше даты (посты и комментарии),
+    ``after_id`` - с первичным ключом больше заданного (для таблиц без
+    даты). С ``since_id`` водяной знак - пара (дата, id) последней
+    выгруженной строки, и строки ровно с этой датой не выгружаются
+    повторно. Водяные знаки для следующей выгрузки попадают в манифест.
+    """
+    table = TABLES[name]
+    queryset = table.model.objects.all()
+    if since is not None and table.date_field:
+        date_field = table.date_field
+        if since_id is None:
+            queryset = queryset.filter(**{f'{date_field}__gte': since})
+        else:
+            queryset = queryset.filter(
+                Q(**{f'{date_field}__gt': since})
+                | Q(**{date_field: since, 'pk__gt': since_id})
+            )
+    if after_id is not None:
+        queryset = queryset.filter(pk__gt=after_id)
+    columns = ('id',) + tuple(column for column, _ in table.columns)
+    lookups = [lookup for _, lookup in table.columns]
+    date_index = (
+        columns.index(table.date_field) if table.date_field else None
+    )
+    writer = WRITERS[format](directory, name)
+    rows_total, last_id, newest = 0, after_id, None
+    try:
+        for rows in iter_chunks(queryset, lookups, chunk_size):
+            writer.write(columns, rows)
+            rows_total += len(rows)
+            last_id = rows[-1][0]
+            if date_index is not None:
+                candidates = [(row[date_index], row[0]) for row in rows]
+                if newest is not None:
+                    candidates.append(newest)
+                newest = max(candidates)
+    finally:
+        files = writer.close()
+    max_date, max_date_id = newest or (since, since_id)
+    return {
+        'files': files,
+        'rows': rows_total,
+        'columns': list(columns),
+        'last_id': last_id,
+        'max_date': _plain(max_date),
+        'max_date_id': max_date_id,
+    }
+
+
+def _export_in_thread(*args, **kwargs):
+    try:
+        return export_table(*args, **kwargs)
+    finally:
+        # У каждого потока своё соединение с базой; его нужно закрыть.
+        connection.close()
+
+
+def watermarks(manifest):
+    """Водяные знаки ``{table: (since, after_id, since_id)}`` из прошлого
+    манифеста."""
+    marks = {}
+    for name, entry in manifest['tables'].items():
+        if TABLES[name].date_field:
+            since = entry.get('max_date')
+            marks[name] = (
+                since and parse_datetime(since), None,
+                entry.get('max_date_id')
+            )
+        else:
+            marks[name] = (None, entry.get('last_id'), None)
+    return marks
+
+
+def export(directory, tables=tuple(TABLES), format='ndjson', since=None,
+           previous=None, chunk_size=CHUNK_SIZE, jobs=1):
+    """Выгружает таблицы в каталог и пишет ``manifest.json``.
+
+    Таблицы независимы, и при ``jobs > 1`` выгружаются параллельно в
+    потоках. ``previous`` - манифест прошлой выгрузки: тогда выгружается
+    только то, что появилось после неё.
+    """
+    os.makedirs(directory, exist_ok=True)
+    marks = watermarks(previous) if previous else {}
+    jobs_args = {
+        name: (name, directory, format) + marks.get(name, (since, None, None))
+        for name in tables
+    }
+    if jobs > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                name: pool.submit(
+                    _export_in_thread, *args, chunk_size=chunk_size
+                )
+                for name, args in jobs_args.items()
+            }
+            results = {
+                name: future.result() for name, future in futures.items()
+            }
+    else:
+        results = {
+            name: export_table(*args, chunk_size=chunk_size)
+            for name, args in jobs_args.items()
+        }
+    manifest = {
+        'created': timezone.now().isoformat(),
+        'format': format,
+        'since': _plain(since),
+        'tables': results,
+    }
+    with open(os.path.join(directory, MANIFEST), 'w') as target:
+        json.dump(manifest, target, ensure_ascii=False, indent=2)
+    return manifest
@@ -0,0 +1,88 @@
+"""Граф подписок для проверок "подписан ли зритель на автора".
+
+Список авторов пользователя хранится в кэше одним значением - байтами
+отсортированного ``array`` с их id, - и загружается одним запросом при
+промахе. Ключ включает версию тега ``following:<id>``, которую сигналы
+подписки и отписки сбрасывают после коммита: список, прочитанный из
+базы до коммита, ляжет под старую версию и читаться уже не будет. Внутри
+запроса список превращается в множество, и любое число проверок идёт
+без SQL за O(1).
+"""
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.db import transaction
+
+from . import cache
+from .models import Follow
+
+FOLLOWING_KEY = 'posts:following:%s:%s'
+TYPECODE = 'L'
+
+
+class FollowedAuthors:
+    """Авторы, на которых подписан пользователь."""
+
+    __slots__ = ('ids',)
+
+    def __init__(self, ids=()):
+        self.ids = frozenset(ids)
+
+    def __contains__(self, author_id):
+        return author_id in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+
+NOBODY = FollowedAuthors()
+
+
+def _tag(user_id):
+    return f'following:{user_id}'
+
+
+def _cached(user_id, version):
+    raw = default_cache.get(FOLLOWING_KEY % (user_id, version))
+    if raw is None:
+        return None
+    ids = array(TYPECODE)
+    ids.frombytes(raw)
+    return ids
+
+
+def _load(user_id, version):
+    ids = array(TYPECODE, Follow.objects.filter(
+        user_id=user_id
+    ).order_by('author_id').values_list('author_id', flat=True))
+    default_cache.set(
+        FOLLOWING_KEY % (user_id, version), ids.tobytes(),
+        settings.FEED_CACHE_TIMEOUT
+    )
+    return ids
+
+
+def followed_authors(user):
+    """``author.pk in followed_authors(request.user)`` без SQL.
+
+    Множество запоминается на объекте пользователя, поэтому страница
+    с карточками многих авторов читает кэш лишь раз (версия и список).
+    """
+    if not user.is_authenticated:
+        return NOBODY
+    followed = getattr(user, 'followed_authors_cache', None)
+    if followed is None:
+        # Версия читается до запроса к базе: подписка, закоммиченная
+        # после него, сбросит её, и этот список станет недостижим.
+        version = cache.version(_tag(user.pk))
+        ids = _cached(user.pk, version)
+        if ids is None:
+            ids = _load(user.pk, version)
+        followed = user.followed_authors_cache = FollowedAuthors(ids)
+    return followed
+
+
+def changed(user_id):
+    """Сбрасывает список подписок пользователя после коммита."""
+    transaction.on_commit(lambda: cache.bump(_tag(user_id)))
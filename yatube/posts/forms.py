@@ -1,6 +1,8 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 from django.utils.translation import gettext_lazy as _
 
+from . import images
 from .models import Post, Comment
 
 
@@ -19,6 +21,19 @@ class PostForm(ModelForm):
             'image': _('Загрузите картиночку'),
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            image, original_size = images.normalize(image)
+            self.instance.image_original_size = original_size
+            self.instance.image_size = image.size
+            self.instance.image_variants = ''
+        elif not image:
+            self.instance.image_original_size = None
+            self.instance.image_size = None
+            self.instance.image_variants = ''
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,149 @@
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, ImageOps
+
+FORMAT_EXTENSIONS = {'WEBP': '.webp', 'JPEG': '.jpg', 'PNG': '.png'}
+CONTENT_TYPES = {
+    'WEBP': 'image/webp', 'JPEG': 'image/jpeg', 'PNG': 'image/png'
+}
+
+# Кадр карточки поста и ширины, в которых он нарезается для srcset.
+# Ширины до CARD_SIZE[0] строятся всегда (как раньше миниатюра 960x339
+# с upscale), более широкие - только из достаточно больших исходников.
+CARD_SIZE = (960, 339)
+CARD_WIDTHS = (320, 480, 640, 960, 1440, 1920)
+# Форматы вариантов: первый отдаётся через <source>, последний - запасной
+# в самом <img>.
+VARIANT_FORMATS = ('WEBP', 'JPEG')
+VARIANTS_DIR = 'posts/variants'
+
+
+def _needs_work(image, size):
+    """Причина перекодировать загрузку или None, если её можно оставить."""
+    if image.getexif():
+        return 'exif'
+    max_width, max_height = settings.POST_IMAGE_MAX_SIZE
+    if image.width > max_width or image.height > max_height:
+        return 'size'
+    if size > settings.POST_IMAGE_KEEP_BYTES:
+        return 'bytes'
+    return None
+
+
+def _encode(image, target):
+    image_format = settings.POST_IMAGE_FORMAT
+    # Из метаданных остаётся только цветовой профиль: без него цвета
+    # сместятся, а EXIF с геометками и моделью камеры выкидывается.
+    options = {'quality': settings.POST_IMAGE_QUALITY}
+    icc_profile = image.info.get('icc_profile')
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    has_alpha = image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+    if image_format == 'JPEG' or not has_alpha:
+        image = image.convert('RGB')
+    elif image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    image.save(target, image_format, **options)
+
+
+def normalize(upload):
+    """Приводит загруженную картинку к виду, в котором её стоит хранить.
+
+    Поворот по EXIF, уменьшение до ``POST_IMAGE_MAX_SIZE``, удаление
+    метаданных и перекодирование в ``POST_IMAGE_FORMAT``. Маленькие
+    картинки без EXIF и анимации остаются как есть. Результат пишется
+    во временный файл на диске, а не в память.
+
+    Возвращает ``(файл, исходный размер в байтах)``.
+    """
+    original_size = upload.size
+    upload.seek(0)
+    with Image.open(upload) as image:
+        if getattr(image, 'is_animated', False):
+            return upload, original_size
+        if not _needs_work(image, original_size):
+            upload.seek(0)
+            return upload, original_size
+        # JPEG декодируется сразу в уменьшенном масштабе (через DCT),
+        # это в разы быстрее полного декодирования камерного снимка.
+        image.draft('RGB', settings.POST_IMAGE_MAX_SIZE)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(settings.POST_IMAGE_MAX_SIZE, Image.LANCZOS)
+        image_format = settings.POST_IMAGE_FORMAT
+        name = (
+            os.path.splitext(os.path.basename(upload.name))[0]
+            + FORMAT_EXTENSIONS[image_format]
+        )
+        # Безымянный временный файл: хранилище скопирует его, а не
+        # переместит, и удалять за ним ничего не придётся.
+        result = UploadedFile(
+            tempfile.TemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR),
+            name, CONTENT_TYPES[image_format]
+        )
+        _encode(image, result.file)
+    result.size = result.file.tell()
+    result.seek(0)
+    return result, original_size
+
+
+def variants_dir(name):
+    """Каталог вариантов картинки: по хэшу имени, без коллизий имён."""
+    digest = hashlib.md5(name.encode()).hexdigest()
+    return f'{VARIANTS_DIR}/{digest[:2]}/{digest}'
+
+
+def _save(storage, name, content):
+    # Имя варианта должно остаться ровно таким, иначе хранилище добавит
+    # суффикс и сохранённые в посте имена разойдутся с файлами.
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(content))
+
+
+def build_variants(name, source_storage, storage=default_storage):
+    """Нарезает кадр карточки из картинки ``name`` во всех ширинах.
+
+    Возвращает описания вариантов - ``{'format', 'width', 'height',
+    'name'}`` - для ``Post.image_variants``.
+    """
+    card_width, card_height = CARD_SIZE
+    largest = (max(CARD_WIDTHS), max(CARD_WIDTHS))
+    directory = variants_dir(name)
+    variants = []
+    with source_storage.open(name) as source, \
+            Image.open(source) as image:
+        image.draft('RGB', largest)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        widths = [
+            width for width in CARD_WIDTHS
+            if width <= max(image.width, card_width)
+        ]
+        for width in widths:
+            size = (width, round(width * card_height / card_width))
+            frame = ImageOps.fit(image, size, Image.LANCZOS)
+            for image_format in VARIANT_FORMATS:
+                buffer = BytesIO()
+                frame.save(
+                    buffer, image_format,
+                    quality=settings.POST_IMAGE_QUALITY
+                )
+                variant_name = (
+                    f'{directory}/{width}'
+                    + FORMAT_EXTENSIONS[image_format]
+                )
+                variants.append({
+                    'format': image_format,
+                    'width': size[0],
+                    'height': size[1],
+                    'name': _save(storage, variant_name, buffer.getvalue()),
+                })
+    return variants
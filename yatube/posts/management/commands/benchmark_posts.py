@@ -0,0 +1,108 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from posts.benchmarks import cards, runner, seed
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет ленты на синтетических данных в отдельной тестовой базе '
+        'и сравнивает с сохранённым отчётом'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', choices=sorted(seed.SIZES), default='10k',
+            help='Число постов в наборе данных'
+        )
+        parser.add_argument(
+            '--posts', type=int,
+            help='Точное число постов вместо --size'
+        )
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Среднее число подписок пользователя')
+        parser.add_argument('--comments', type=int, default=3,
+                            help='Среднее число комментариев к посту')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Запросов на каждое представление')
+        parser.add_argument('--warm', action='store_true',
+                            help='Не очищать кэш между запросами')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Не удалять тестовую базу и не '
+                                 'заполнять её повторно')
+        parser.add_argument('--output', help='Куда записать JSON-отчёт')
+        parser.add_argument('--compare',
+                            help='Базовый JSON-отчёт для сравнения')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Допустимый относительный рост времени')
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb']
+        )
+        try:
+            report = self.benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb']
+            )
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                regressions = runner.compare(
+                    report, json.load(baseline), options['threshold']
+                )
+            if regressions:
+                raise CommandError(
+                    'Регрессии производительности:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+    def benchmark(self, options):
+        posts = options['posts'] or seed.SIZES[options['size']]
+        if not (options['keepdb'] and Post.objects.exists()):
+            self.stdout.write(f'Заполнение базы: {posts} постов...')
+            seed.seed(
+                posts,
+                follows=options['follows'],
+                comments=options['comments'],
+            )
+        return {
+            'created': timezone.now().isoformat(),
+            'dataset': seed.dataset(),
+            'settings': {
+                'pagination': settings.POSTS_PAGINATION,
+                'cache': settings.CACHES['default']['BACKEND'],
+                'warm': options['warm'],
+            },
+            'views': runner.run(options['repeat'], options['warm']),
+            'cards': cards.run(options['repeat']),
+        }
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"{'view':<14}{'queries':>8}{'sql':>9}{'tpl':>9}"
+            f"{'p50':>9}{'p90':>9}{'p99':>9}"
+        )
+        for view, metrics in report['views'].items():
+            self.stdout.write(
+                f"{view:<14}{metrics['queries']:>8}"
+                f"{metrics['sql_ms']:>9.2f}{metrics['template_ms']:>9.2f}"
+                f"{metrics['wall_p50_ms']:>9.2f}{metrics['wall_p90_ms']:>9.2f}"
+                f"{metrics['wall_p99_ms']:>9.2f}"
+            )
+        card_metrics = report['cards']
+        self.stdout.write(
+            f"Карточки ({card_metrics['cards']} шт.): include "
+            f"{card_metrics['include_p50_ms']:.2f} мс, render_cards "
+            f"{card_metrics['render_cards_p50_ms']:.2f} мс, "
+            f"x{card_metrics['speedup']:.2f}"
+        )
@@ -0,0 +1,32 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации "на кого подписаться" по графу подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k', type=int, default=recommendations.TOP_K,
+            help='Сколько кандидатов хранить на пользователя'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=recommendations.CHUNK_SIZE,
+            help='Строк матрицы в одном блоке'
+        )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+
+        def progress(done, total, stored):
+            self.stdout.write(f'{done}/{total} пользователей, {stored} строк')
+
+        stored = recommendations.build(
+            options['top_k'], options['chunk_size'], progress
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендаций: {stored} за {perf_counter() - started:.1f} с'
+        ))
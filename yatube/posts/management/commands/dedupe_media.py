@@ -0,0 +1,67 @@
+import os
+
+from django.core.cache import cache as default_cache
+from django.core.management.base import BaseCommand
+
+from posts import storage
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов в хранилище по хэшу содержимого: '
+        'одинаковые файлы остаются в одном экземпляре'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, что будет перенесено'
+        )
+
+    def legacy_names(self):
+        names = Post.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).order_by('image').values_list('image', flat=True).distinct()
+        for name in names.iterator():
+            if not storage.is_content_name(name):
+                yield name
+
+    def handle(self, *args, **options):
+        blobs = Post._meta.get_field('image').storage
+        upload_to = Post._meta.get_field('image').upload_to
+        # Список имён собирается заранее: ниже они переписываются.
+        names = list(self.legacy_names())
+        moved = missing = freed = 0
+        targets = set()
+        for name in names:
+            if not blobs.exists(name):
+                missing += 1
+                self.stderr.write(f'{name}: файла нет')
+                continue
+            size = blobs.size(name)
+            if options['dry_run']:
+                moved += 1
+                continue
+            with blobs.open(name) as content:
+                new_name = blobs.save(
+                    os.path.join(upload_to, os.path.basename(name)), content
+                )
+            if Post.objects.filter(image=new_name).exists():
+                freed += size
+            # Варианты строились под старым именем; под новым их
+            # построит pregenerate_thumbnails, один раз на содержимое.
+            Post.objects.filter(image=name).update(
+                image=new_name, image_variants=''
+            )
+            storage.unreserve(new_name)
+            blobs.delete(name)
+            storage.delete_variants(name)
+            targets.add(new_name)
+            moved += 1
+        if moved and not options['dry_run']:
+            default_cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено: {moved}, различных файлов: {len(targets)}, '
+            f'освобождено: {freed / 2 ** 20:.1f} МБ, без файла: {missing}'
+        ))
@@ -0,0 +1,76 @@
+import json
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import exporter
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, посты, комментарии и подписки в сжатый NDJSON '
+        'или по столбцам, порциями и без загрузки таблиц в память'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог для выгрузки')
+        parser.add_argument(
+            '--tables', nargs='+', choices=list(exporter.TABLES),
+            default=list(exporter.TABLES),
+            help='Какие таблицы выгружать (по умолчанию - все)'
+        )
+        parser.add_argument(
+            '--format', choices=exporter.FORMATS, default='ndjson',
+            help='ndjson - один .ndjson.gz на таблицу, columnar - '
+                 'части со списками значений столбцов'
+        )
+        parser.add_argument(
+            '--since',
+            help='Только посты и комментарии не старше этой даты (ISO 8601)'
+        )
+        parser.add_argument(
+            '--incremental', metavar='MANIFEST',
+            help='manifest.json прошлой выгрузки: выгрузить только новое'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=exporter.CHUNK_SIZE,
+            help='Строк в одном запросе к базе'
+        )
+        parser.add_argument(
+            '--jobs', type=int, default=1,
+            help='Сколько таблиц выгружать параллельно'
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError(f"--since: не дата {options['since']!r}")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+        previous = None
+        if options['incremental']:
+            with open(options['incremental']) as source:
+                previous = json.load(source)
+        started = perf_counter()
+        manifest = exporter.export(
+            options['directory'],
+            tables=options['tables'],
+            format=options['format'],
+            since=since,
+            previous=previous,
+            chunk_size=options['chunk_size'],
+            jobs=options['jobs'],
+        )
+        elapsed = perf_counter() - started
+        total = 0
+        for name, entry in manifest['tables'].items():
+            total += entry['rows']
+            self.stdout.write(f"{name}: {entry['rows']} строк")
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено {total} строк, {rate:.0f} строк/с'
+        ))
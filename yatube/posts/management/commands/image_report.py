@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Q, Sum
+
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Сколько места сэкономила обработка картинок при загрузке'
+
+    def handle(self, *args, **options):
+        totals = Post.objects.filter(
+            image_original_size__isnull=False
+        ).aggregate(
+            images=Count('pk'),
+            reencoded=Count(
+                'pk', filter=~Q(image_size=F('image_original_size'))
+            ),
+            original=Sum('image_original_size'),
+            stored=Sum('image_size'),
+        )
+        original = totals['original'] or 0
+        stored = totals['stored'] or 0
+        saved = original - stored
+        share = saved / original * 100 if original else 0
+        self.stdout.write(
+            f"Картинок: {totals['images']}, "
+            f"перекодировано: {totals['reencoded']}\n"
+            f'Загружено: {original / 2 ** 20:.1f} МБ\n'
+            f'Хранится: {stored / 2 ** 20:.1f} МБ\n'
+            f'Сэкономлено: {saved / 2 ** 20:.1f} МБ ({share:.0f}%)'
+        )
@@ -0,0 +1,106 @@
+import json
+import os
+import sys
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importer
+from posts.bulk import rebuild_derived
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает пользователей, группы, посты, комментарии или '
+        'подписки из NDJSON/CSV'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(importer.IMPORTERS))
+        parser.add_argument(
+            'path', help='Файл .ndjson/.csv (можно .gz) или - для stdin'
+        )
+        parser.add_argument(
+            '--format', choices=['ndjson', 'csv'],
+            help='Формат входа (по умолчанию - по расширению)'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=importer.CHUNK_SIZE,
+            help='Строк в одной транзакции'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл, где запоминается обработанная часть входа; '
+                 'при повторном запуске импорт продолжится с неё'
+        )
+        parser.add_argument(
+            '--no-rebuild', action='store_true',
+            help='Не пересобирать счётчики, ленты и поиск (удобно, '
+                 'если следом будет импорт другого файла)'
+        )
+
+    def handle(self, *args, **options):
+        kind, path = options['kind'], options['path']
+        checkpoint = options['checkpoint']
+        skip = self.read_checkpoint(checkpoint, kind, path)
+        if skip:
+            self.stdout.write(f'Продолжение с {skip}-й строки')
+        self.totals = {'imported': 0, 'skipped': 0}
+        self.started = perf_counter()
+
+        def on_chunk(rows, imported, skipped):
+            self.totals['imported'] += imported
+            self.totals['skipped'] += skipped
+            self.write_checkpoint(checkpoint, kind, path, rows)
+            self.report(rows - skip)
+
+        stream = importer.open_input(path)
+        try:
+            rows = importer.read_rows(
+                stream, options['format'] or importer.guess_format(path)
+            )
+            importer.import_rows(
+                kind, rows, options['chunk_size'], skip, on_chunk
+            )
+        except ValueError as error:
+            raise CommandError(f'Импорт остановлен: {error}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        if not options['no_rebuild']:
+            rebuild_derived()
+        self.stdout.write(self.style.SUCCESS(
+            f"{kind}: принято {self.totals['imported']}, "
+            f"пропущено {self.totals['skipped']}"
+        ))
+
+    def report(self, rows):
+        elapsed = perf_counter() - self.started
+        rate = rows / elapsed if elapsed else 0
+        self.stdout.write(f'{rows} строк, {rate:.0f} строк/с')
+
+    @staticmethod
+    def read_checkpoint(checkpoint, kind, path):
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as source:
+            state = json.load(source)
+        if (state.get('kind'), state.get('path')) != (kind, path):
+            raise CommandError(
+                f'{checkpoint} относится к импорту {state.get("kind")} '
+                f'из {state.get("path")}'
+            )
+        return int(state['rows'])
+
+    @staticmethod
+    def write_checkpoint(checkpoint, kind, path, rows):
+        if not checkpoint:
+            return
+        # Запись через переименование: прерванный процесс не оставит
+        # наполовину записанный файл.
+        temporary = checkpoint + '.tmp'
+        with open(temporary, 'w') as target:
+            json.dump({'kind': kind, 'path': path, 'rows': rows}, target)
+        os.replace(temporary, checkpoint)
@@ -0,0 +1,78 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.core.management.base import BaseCommand
+
+from posts import cache, thumbnails
+from posts.models import Post
+
+BATCH_SIZE = 1000
+
+
+def generate(name, force=False):
+    try:
+        tags = thumbnails.generate(name, force)
+    except Exception as error:
+        return name, [], error
+    return name, tags, None
+
+
+class Command(BaseCommand):
+    help = 'Строит недостающие миниатюры картинок постов в пуле процессов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=multiprocessing.cpu_count(),
+            help='Число процессов (по умолчанию - по числу ядер, 0 - без пула)'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перестроить и уже готовые миниатюры'
+        )
+
+    def batches(self, force):
+        names = Post.objects.exclude(image='').exclude(image__isnull=True)
+        if not force:
+            names = names.filter(image_variants='')
+        names = names.order_by('image').values_list(
+            'image', flat=True
+        ).distinct()
+        batch = []
+        for name in names.iterator():
+            batch.append(name)
+            if len(batch) == BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def handle(self, *args, **options):
+        if options['workers']:
+            with ProcessPoolExecutor(
+                max_workers=options['workers'],
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=thumbnails.init_worker,
+            ) as pool:
+                self.run(options['force'], partial(pool.map, chunksize=16))
+        else:
+            self.run(options['force'], map)
+
+    def run(self, force, map_):
+        done = failed = 0
+        for batch in self.batches(force):
+            tags = set()
+            results = map_(partial(generate, force=force), batch)
+            for name, batch_tags, error in results:
+                if error is None:
+                    done += 1
+                    tags.update(batch_tags)
+                else:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+            # Как thumbnails._finished: закэшированные страницы с
+            # исходной картинкой вместо вариантов устарели.
+            cache.bump(*tags)
+        self.stdout.write(self.style.SUCCESS(
+            f'Построено: {done}, с ошибками: {failed}'
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import User
+from posts.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики подписчиков, подписок, постов '
+        'и комментариев'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Только эти пользователи (по умолчанию - все)'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            user_ids = list(
+                User.objects.filter(
+                    username__in=options['usernames']
+                ).values_list('pk', flat=True)
+            )
+        rebuild(user_ids)
+        self.stdout.write(self.style.SUCCESS('Счётчики пересобраны'))
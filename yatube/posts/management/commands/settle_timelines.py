@@ -0,0 +1,19 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Раскладывает по лентам посты авторов, опустившихся до '
+        'TIMELINE_FANOUT_LIMIT подписчиков; запускается по расписанию'
+    )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        settled = timeline.settle_pending()
+        self.stdout.write(self.style.SUCCESS(
+            f'Авторов разложено: {settled} за {perf_counter() - started:.1f} с'
+        ))
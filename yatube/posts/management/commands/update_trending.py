@@ -0,0 +1,26 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинг "в тренде" для постов с новой активностью; '
+        'запускается по расписанию'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=trending.CHUNK_SIZE,
+            help='Постов в одной транзакции'
+        )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        scored, pruned = trending.update(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано постов: {scored}, удалено устаревших: {pruned} '
+            f'за {perf_counter() - started:.1f} с'
+        ))
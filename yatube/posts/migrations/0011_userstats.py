@@ -0,0 +1,59 @@
+# Generated by Django 2.2.6 on 2026-10-18 20:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    def counts(model, field):
+        return dict(
+            model.objects.order_by().values_list(field).annotate(Count('pk'))
+        )
+
+    followers = counts(Follow, 'author_id')
+    following = counts(Follow, 'user_id')
+    posts = counts(Post, 'author_id')
+    comments = counts(Comment, 'author_id')
+    UserStats.objects.bulk_create(
+        (
+            UserStats(
+                user_id=pk,
+                followers=followers.get(pk, 0),
+                following=following.get(pk, 0),
+                posts=posts.get(pk, 0),
+                comments=comments.get(pk, 0),
+            )
+            for pk in User.objects.values_list('pk', flat=True)
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0010_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('followers', models.PositiveIntegerField(default=0)),
+                ('following', models.PositiveIntegerField(default=0)),
+                ('posts', models.PositiveIntegerField(default=0)),
+                ('comments', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-18 21:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_trendingpost'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='timeline_pending',
+            field=models.BooleanField(default=False),
+        ),
+    ]
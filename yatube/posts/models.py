@@ -1,7 +1,10 @@
 from django.db import models
-from django.db.models import Q, F
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -14,6 +17,20 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Посты для карточек ленты: автор и группа одним JOIN,
+        число комментариев - коррелированным подзапросом."""
+        comments = Comment.objects.filter(
+            post=OuterRef('pk')
+        ).order_by().values('post').annotate(count=Count('*')).values('count')
+        return self.select_related('author', 'group').annotate(
+            comment_count=Coalesce(
+                Subquery(comments, output_field=IntegerField()), 0
+            )
+        )
+
+
 class Post(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField('date published', auto_now_add=True)
@@ -27,10 +44,44 @@ class Post(models.Model):
         on_delete=models.SET_NULL,
         related_name='posts', blank=True, null=True
     )
-    image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    # Одинаковые картинки хранятся одним файлом, см. storage.release.
+    image = models.ImageField(
+        upload_to='posts/', storage=ContentAddressedStorage(),
+        blank=True, null=True
+    )
+    # Размеры картинки в байтах до и после обработки при загрузке.
+    image_original_size = models.PositiveIntegerField(
+        blank=True, null=True, editable=False
+    )
+    image_size = models.PositiveIntegerField(
+        blank=True, null=True, editable=False
+    )
+    # JSON-список вариантов кадра карточки для srcset (см.
+    # images.build_variants); пусто, пока пул миниатюр их не построил.
+    image_variants = models.TextField(blank=True, default='', editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        # id в конце совпадает с порядком CursorPaginator и делает порядок
+        # однозначным при равных pub_date.
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            # Подсчёт ссылок на блоб картинки и поиск готовых вариантов.
+            models.Index(fields=['image'], name='post_image_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -52,6 +103,14 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'
+            ),
+            # Комментарии после метки прошлого пересчёта trending.
+            models.Index(fields=['created'], name='comment_created_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -81,3 +140,123 @@ class Follow(models.Model):
                 name='not_yourself_following'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+        ]
+
+
+class Timeline(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    pub_date = models.DateTimeField('date published')
+
+    class Meta:
+        ordering = ['-pub_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='timeline_user_post_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    followers = models.PositiveIntegerField(default=0)
+    following = models.PositiveIntegerField(default=0)
+    posts = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+    # Автор опустился до TIMELINE_FANOUT_LIMIT, но его посты ещё не
+    # разложены по лентам: до settle_timelines они домешиваются при чтении.
+    timeline_pending = models.BooleanField(default=False)
+
+    def __str__(self):
+        return str(self.user)
+
+
+class Recommendation(models.Model):
+    """Кандидат "на кого подписаться", посчитанный пакетно.
+
+    Строки целиком пересобирает ``build_recommendations``; страницы
+    читают их одним запросом по индексу (user, -score).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations'
+    )
+    candidate = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommended_to'
+    )
+    score = models.FloatField()
+    # Сколько авторов из подписок пользователя подписаны на кандидата.
+    mutual = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'candidate'),
+                name='recommendation_user_candidate_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score'],
+                name='recommendation_user_score_idx'
+            ),
+        ]
+
+
+class TrendingPost(models.Model):
+    """Оценка поста для ленты "в тренде", см. ``posts.trending``.
+
+    Строки добавляет и пересчитывает ``update_trending`` только для
+    постов с новой активностью; лента читает их по индексу (-score, -post).
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending'
+    )
+    # Логарифм суммы весов событий относительно trending.EPOCH.
+    score = models.FloatField()
+    # Комментариев в окне trending.HORIZON.
+    comments = models.PositiveIntegerField(default=0)
+    last_activity = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-score', '-post'],
+                name='trending_score_idx'
+            ),
+            models.Index(
+                fields=['last_activity'],
+                name='trending_last_activity_idx'
+            ),
+        ]
@@ -0,0 +1,114 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache as default_cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, HttpResponseNotModified
+
+from . import cache
+
+PAGE_KEY = 'posts:page:%s'
+# Бэкенды, у которых своё содержимое в каждом процессе: сброс тегов в
+# одном воркере не виден остальным.
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def tag(response, *tags):
+    """Разрешает закэшировать ответ для гостей под тегами зависимостей.
+
+    Страница отдаётся из кэша, пока версии этих тегов в ``posts.cache``
+    не сброшены сигналами.
+    """
+    response.page_cache_tags = tags
+    return response
+
+
+def post_tags(post_id, author_id, group_id=None):
+    """Теги страниц, на которых виден пост (кроме главной - там ``feed``)."""
+    tags = [f'post:{post_id}', f'author:{author_id}']
+    if group_id is not None:
+        tags.append(f'group:{group_id}')
+    return tags
+
+
+def _key(request):
+    raw = request.META.get('HTTP_HOST', '') + request.get_full_path()
+    return PAGE_KEY % hashlib.md5(raw.encode()).hexdigest()
+
+
+class AnonymousPageCacheMiddleware:
+    """Целые страницы лент и постов для гостей.
+
+    Стоит до сессий и аутентификации: попадание в кэш - два обращения к
+    кэшу без ORM и шаблонов. Запросы с cookie сессии идут мимо кэша, а
+    ответы, ставящие cookie (в том числе CSRF), не сохраняются.
+
+    Включается, только если кэш по умолчанию общий для всех процессов:
+    иначе страница, сброшенная в одном воркере, отдавалась бы соседями
+    до конца ``ANONYMOUS_PAGE_CACHE_TIMEOUT``.
+    """
+
+    def __init__(self, get_response):
+        if not settings.ANONYMOUS_PAGE_CACHE_TIMEOUT:
+            raise MiddlewareNotUsed('ANONYMOUS_PAGE_CACHE_TIMEOUT = 0')
+        if isinstance(caches['default'], PROCESS_LOCAL_BACKENDS):
+            raise MiddlewareNotUsed(
+                'Кэш страниц гостей требует общего для процессов кэша'
+            )
+        self.get_response = get_response
+
+    def cacheable_request(self, request):
+        return (
+            settings.ANONYMOUS_PAGE_CACHE_TIMEOUT
+            and request.method in ('GET', 'HEAD')
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        )
+
+    def __call__(self, request):
+        if not self.cacheable_request(request):
+            return self.get_response(request)
+        key = _key(request)
+        response = self.cached(request, key)
+        if response is not None:
+            return response
+        response = self.get_response(request)
+        self.store(request, key, response)
+        return response
+
+    def cached(self, request, key):
+        entry = default_cache.get(key)
+        if entry is None:
+            return None
+        tags, tag_versions, status, headers, content = entry
+        if cache.versions(*tags) != tag_versions:
+            return None
+        etag = dict(headers).get('ETag')
+        if etag and request.META.get('HTTP_IF_NONE_MATCH') == etag:
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+        response = HttpResponse(content, status=status)
+        for header, value in headers:
+            response[header] = value
+        return response
+
+    def store(self, request, key, response):
+        tags = getattr(response, 'page_cache_tags', None)
+        if (
+            tags is None
+            or request.method != 'GET'
+            or response.status_code != 200
+            or response.streaming
+            or response.cookies
+            or request.META.get('CSRF_COOKIE_USED')
+        ):
+            return
+        default_cache.set(key, (
+            tags,
+            cache.versions(*tags),
+            response.status_code,
+            list(response.items()),
+            response.content,
+        ), settings.ANONYMOUS_PAGE_CACHE_TIMEOUT)
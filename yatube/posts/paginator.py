@@ -0,0 +1,243 @@
+import base64
+import binascii
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q, QuerySet
+
+from . import cache
+
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+DEFAULT_ORDERING = ('-pub_date', '-id')
+COUNT_KEY = 'posts:count:%s:%s'
+
+
+class WindowPaginator(Paginator):
+    """``Paginator`` с окном номеров страниц вместо полного page_range."""
+
+    ELLIPSIS = '…'
+
+    def get_elided_page_range(self, number=1, on_each_side=3, on_ends=1):
+        """Номера первых, последних и соседних с ``number`` страниц.
+
+        Пропуски обозначены ``ELLIPSIS``; как в Django 3.2, откуда
+        взяты имя и поведение.
+        """
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(
+                self.num_pages - on_ends + 1, self.num_pages + 1
+            )
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+
+def cached_count(queryset, tags):
+    """``COUNT(*)`` выборки из кэша, пока не сброшены версии ``tags``.
+
+    Ключ - хэш SQL подсчёта, так что у каждой ленты (группы, подписок
+    пользователя) он свой; запись в теги даёт пересчёт при следующем
+    чтении.
+    """
+    queryset = queryset.values('pk')
+    sql, params = queryset.query.sql_with_params()
+    signature = hashlib.md5(repr((sql, params)).encode()).hexdigest()
+    key = COUNT_KEY % (
+        signature, '.'.join(map(str, cache.versions(*tags)))
+    )
+    count = default_cache.get(key)
+    if count is None:
+        count = queryset.count()
+        default_cache.set(key, count, settings.FEED_CACHE_TIMEOUT)
+    return count
+
+
+class CursorPage:
+    """Страница курсорной пагинации: знает только соседей, а не номера."""
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage %s..%s>' % (
+            self.previous_cursor, self.next_cursor
+        )
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Пагинация по ключу (keyset) без OFFSET и COUNT(*).
+
+    Курсор - непрозрачный токен со значениями полей ``ordering`` крайнего
+    объекта страницы; следующая страница читается как диапазон индекса.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, ordering=None):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        if ordering is None:
+            # Явный order_by выборки уже задаёт однозначный порядок
+            # под её индекс, например в ленте подписок.
+            ordering = object_list.query.order_by or DEFAULT_ORDERING
+        self.ordering = tuple(ordering)
+        self.fields = tuple(name.lstrip('-') for name in self.ordering)
+
+    def get_page(self, after=None, before=None):
+        """Возвращает страницу после или до курсора.
+
+        Испорченный или устаревший курсор, как и номер страницы в
+        ``Paginator.get_page``, просто ведёт на первую страницу.
+        """
+        if before:
+            values = self.decode(before)
+            if values is not None:
+                return self._page_before(values)
+        values = self.decode(after) if after else None
+        return self._page_after(values)
+
+    def _page_after(self, values):
+        queryset = self.object_list.order_by(*self.ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, backwards=False))
+        items = list(queryset[:self.per_page + 1])
+        has_next = len(items) > self.per_page
+        items = items[:self.per_page]
+        return CursorPage(
+            items,
+            self,
+            self.encode(items[-1]) if has_next else None,
+            self.encode(items[0]) if values is not None and items else None,
+        )
+
+    def _page_before(self, values):
+        reverse = [
+            name[1:] if name.startswith('-') else '-' + name
+            for name in self.ordering
+        ]
+        queryset = self.object_list.order_by(*reverse).filter(
+            self._seek(values, backwards=True)
+        )
+        items = list(queryset[:self.per_page + 1])
+        has_previous = len(items) > self.per_page
+        items = items[:self.per_page][::-1]
+        return CursorPage(
+            items,
+            self,
+            self.encode(items[-1]) if items else None,
+            self.encode(items[0]) if has_previous else None,
+        )
+
+    def _seek(self, values, backwards):
+        """Условие "строго после курсора" в порядке ``ordering``.
+
+        Для (a, b) по убыванию это ``a < x OR (a = x AND b < y)``.
+        """
+        condition = Q()
+        equal = Q()
+        for name, field, value in zip(self.ordering, self.fields, values):
+            descending = name.startswith('-') != backwards
+            lookup = '%s__%s' % (field, 'lt' if descending else 'gt')
+            condition |= equal & Q(**{lookup: value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def encode(self, obj):
+        values = []
+        for field in self.fields:
+            value = getattr(obj, field)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append(value)
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(raw.decode())
+            if len(values) != len(self.fields):
+                return None
+            values = [
+                self._model_field(field).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            return None
+        # Поля ленты не бывают NULL, а lt/gt с None ORM не строит.
+        if any(value is None for value in values):
+            return None
+        return values
+
+    def _model_field(self, name):
+        query = self.object_list.query
+        if name in query.annotations:
+            return query.annotations[name].output_field
+        opts = self.object_list.model._meta
+        try:
+            return opts.pk if name == 'pk' else opts.get_field(name)
+        except FieldDoesNotExist:
+            raise ValueError(name)
+
+
+def paginate(request, object_list, per_page=POSTS_PER_PAGE, count=None,
+             count_tags=None):
+    """Страница ленты в режиме из настройки ``POSTS_PAGINATION``.
+
+    ``'numbered'`` - ``WindowPaginator`` с ``?page=N``,
+    ``'cursor'`` - ``CursorPaginator`` с ``?after=``/``?before=``.
+    Заранее известный ``count`` избавляет ``Paginator`` от ``COUNT(*)``;
+    с ``count_tags`` число берётся из кэша под версиями этих тегов.
+    Посты считаются без аннотаций ``for_listing``: подзапрос числа
+    комментариев в ``COUNT(*)`` лишь мешает обойтись одним индексом.
+    """
+    if settings.POSTS_PAGINATION == 'cursor':
+        return CursorPaginator(object_list, per_page).get_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    paginator = WindowPaginator(object_list, per_page)
+    if count is None and isinstance(object_list, QuerySet):
+        if count_tags:
+            count = cached_count(object_list, count_tags)
+        else:
+            count = object_list.values('pk').count()
+    if count is not None:
+        paginator.count = count
+    return paginator.get_page(request.GET.get('page'))
@@ -0,0 +1,133 @@
+"""Пакетный расчёт рекомендаций "на кого подписаться".
+
+Подписки выгружаются в разреженную матрицу смежности ``A`` над плотной
+нумерацией пользователей: ``A[u, a] = 1``, если ``u`` подписан на ``a``.
+Для блока строк считаются два сигнала:
+
+* два шага, ``A·A`` - доля авторов из подписок пользователя, которые
+  сами подписаны на кандидата;
+* соподписки, ``(A·Aᵀ)·A`` - на кого подписаны люди с похожими
+  подписками, с весом по числу общих авторов.
+
+Сам пользователь и те, на кого он уже подписан, вычёркиваются; из
+остальных в таблицу ``Recommendation`` попадают ``top_k`` лучших.
+"""
+from itertools import chain
+
+import numpy as np
+from django.db import transaction
+from scipy import sparse
+
+from . import cache
+from .models import Follow, Recommendation
+
+TOP_K = 20
+# Не больше 999 параметров SQLite в user_id__in при удалении старых строк.
+CHUNK_SIZE = 500
+CO_FOLLOW_WEIGHT = 0.5
+READ_CHUNK_SIZE = 50000
+
+
+def load_graph():
+    """``(A, ids)``: CSR-матрица подписок и id пользователя каждой строки."""
+    pairs = Follow.objects.order_by().values_list('user_id', 'author_id')
+    flat = np.fromiter(
+        chain.from_iterable(pairs.iterator(chunk_size=READ_CHUNK_SIZE)),
+        dtype=np.int64
+    )
+    ids, dense = np.unique(flat, return_inverse=True)
+    dense = dense.reshape(-1, 2)
+    size = len(ids)
+    graph = sparse.csr_matrix(
+        (np.ones(len(dense), dtype=np.float32), (dense[:, 0], dense[:, 1])),
+        shape=(size, size)
+    )
+    return graph, ids
+
+
+def _row_normalized(matrix, totals):
+    totals = np.asarray(totals, dtype=np.float32).ravel()
+    totals[totals == 0] = 1
+    return sparse.diags(1 / totals) @ matrix
+
+
+def score_chunk(graph, transposed, start, stop):
+    """Оценки кандидатов и число общих авторов для строк ``start:stop``."""
+    rows = graph[start:stop]
+    own = sparse.csr_matrix(
+        (
+            np.ones(stop - start, dtype=np.float32),
+            (np.arange(stop - start), np.arange(start, stop))
+        ),
+        shape=rows.shape
+    )
+    mutual = rows @ graph
+    similarity = rows @ transposed
+    similarity = similarity - similarity.multiply(own)
+    co_follow = similarity @ graph
+    scores = (
+        _row_normalized(mutual, rows.sum(axis=1))
+        + CO_FOLLOW_WEIGHT
+        * _row_normalized(co_follow, similarity.sum(axis=1))
+    )
+    excluded = (rows + own) > 0
+    scores = sparse.csr_matrix(scores - scores.multiply(excluded))
+    scores.eliminate_zeros()
+    scores.sort_indices()
+    return scores, sparse.csr_matrix(mutual)
+
+
+def top_candidates(scores, top_k):
+    """Пары (строка, столбец) ``top_k`` лучших оценок каждой строки."""
+    rows, columns = [], []
+    for row in range(scores.shape[0]):
+        begin, end = scores.indptr[row], scores.indptr[row + 1]
+        data = scores.data[begin:end]
+        best = np.arange(len(data))
+        if len(data) > top_k:
+            best = np.argpartition(-data, top_k)[:top_k]
+        # При равных оценках - меньший номер, чтобы результат не плавал.
+        best = best[np.lexsort((best, -data[best]))]
+        rows.append(np.full(len(best), row))
+        columns.append(scores.indices[begin:end][best])
+    if not rows:
+        return np.array([], dtype=int), np.array([], dtype=int)
+    return np.concatenate(rows), np.concatenate(columns)
+
+
+def build(top_k=TOP_K, chunk_size=CHUNK_SIZE, on_chunk=None):
+    """Пересчитывает таблицу рекомендаций; возвращает число строк."""
+    graph, ids = load_graph()
+    transposed = graph.T.tocsr()
+    stored = 0
+    for start in range(0, len(ids), chunk_size):
+        stop = min(start + chunk_size, len(ids))
+        scores, mutual = score_chunk(graph, transposed, start, stop)
+        rows, columns = top_candidates(scores, top_k)
+        values = np.asarray(scores[rows, columns]).ravel()
+        counts = np.asarray(mutual[rows, columns]).ravel()
+        user_ids = ids[start:stop]
+        with transaction.atomic():
+            Recommendation.objects.filter(
+                user_id__in=user_ids.tolist()
+            ).delete()
+            Recommendation.objects.bulk_create(
+                Recommendation(
+                    user_id=int(user_ids[row]),
+                    candidate_id=int(ids[column]),
+                    score=float(score),
+                    mutual=int(count),
+                )
+                for row, column, score, count in zip(
+                    rows, columns, values, counts
+                )
+            )
+        stored += len(rows)
+        if on_chunk is not None:
+            on_chunk(stop, len(ids), stored)
+    # У тех, кто отписался ото всех, строк в матрице уже нет.
+    Recommendation.objects.exclude(
+        user__in=Follow.objects.values('user')
+    ).delete()
+    cache.bump('recommendations')
+    return stored
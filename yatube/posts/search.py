@@ -0,0 +1,149 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+SNIPPET_TOKENS = 16
+# Маркеры подсветки, которых не бывает в тексте: snippet() вставляет их,
+# а после экранирования они превращаются в <mark>.
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Превращает ввод пользователя в безопасное выражение FTS5 MATCH.
+
+    Каждое слово берётся в кавычки (синтаксис FTS5 из ввода не
+    пробрасывается), последнее ищется по префиксу.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return ''
+    terms = ['"%s"' % word for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def index_posts(posts):
+    if not available():
+        return
+    posts = list(posts)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(post.pk,) for post in posts]
+        )
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+            [(post.pk, post.text) for post in posts]
+        )
+
+
+def unindex_posts(post_ids):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(post_id,) for post_id in post_ids]
+        )
+
+
+def rebuild_index():
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) '
+            f'SELECT id, text FROM {Post._meta.db_table}'
+        )
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"
+        )
+
+
+def matching(queryset, query):
+    """Сужает queryset постов до совпадений с query."""
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    if not available():
+        return queryset.filter(text__icontains=query)
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [expression]
+    ))
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+class SearchResults:
+    """Ленивый список найденных постов по релевантности (bm25) для Paginator.
+
+    Срез выполняет один запрос к индексу с LIMIT/OFFSET и один запрос за
+    постами страницы; ``count()`` считает совпадения в самом индексе.
+    """
+
+    def __init__(self, query):
+        self.expression = match_expression(query)
+
+    def count(self):
+        if not self.expression:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                [self.expression]
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        if not self.expression or index.stop is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, snippet({FTS_TABLE}, 0, %s, %s, %s, %s) '
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank LIMIT %s OFFSET %s',
+                [
+                    MARK_START, MARK_END, '…', SNIPPET_TOKENS,
+                    self.expression, index.stop - start, start,
+                ]
+            )
+            rows = cursor.fetchall()
+        posts = Post.objects.for_listing().in_bulk([pk for pk, _ in rows])
+        results = []
+        for pk, snippet in rows:
+            post = posts.get(pk)
+            if post is not None:
+                post.snippet = highlight(snippet)
+                results.append(post)
+        return results
+
+
+def search_posts(query):
+    if not available():
+        return matching(Post.objects.for_listing(), query)
+    return SearchResults(query)
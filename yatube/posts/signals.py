@@ -0,0 +1,151 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache, follows, pagecache, search, stats, storage, timeline
+from .models import Comment, Follow, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def create_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out([instance])
+        stats.bump(instance.author_id, posts=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    stats.bump(instance.author_id, posts=-1)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.index_posts([instance])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex_posts([instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(instance.author_id, comments=1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    stats.bump(instance.author_id, comments=-1)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance.user_id, instance.author_id)
+        stats.bump(instance.author_id, followers=1)
+        stats.bump(instance.user_id, following=1)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.prune(instance.user_id, instance.author_id)
+    stats.bump(instance.author_id, followers=-1)
+    stats.bump(instance.user_id, following=-1)
+    timeline.settle_author(instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def remember_follow(sender, instance, created, **kwargs):
+    if created:
+        follows.changed(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def forget_follow(sender, instance, **kwargs):
+    follows.changed(instance.user_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_feed(sender, **kwargs):
+    cache.bump('feed')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feed(sender, instance, **kwargs):
+    cache.bump(f'follow:{instance.user_id}')
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, raw=False, **kwargs):
+    # Пост, перенесённый в другую группу, должен пропасть и со страницы
+    # прежней группы, а заменённая картинка - освободиться.
+    if instance.pk is not None and not raw:
+        instance.saved_group_id, instance.saved_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image').order_by().first() or (None, None)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    tags = pagecache.post_tags(
+        instance.pk, instance.author_id, instance.group_id
+    )
+    saved_group_id = getattr(instance, 'saved_group_id', None)
+    if saved_group_id not in (None, instance.group_id):
+        tags.append(f'group:{saved_group_id}')
+    cache.bump(*tags)
+
+
+def release_after_commit(name):
+    if name:
+        transaction.on_commit(lambda: storage.release(name))
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, **kwargs):
+    saved_image = getattr(instance, 'saved_image', None)
+    if saved_image != (instance.image.name or None):
+        release_after_commit(saved_image)
+
+
+@receiver(post_save, sender=Post)
+def unreserve_saved_image(sender, instance, **kwargs):
+    # Ссылка на блоб видна всем - бронь загрузки больше не нужна.
+    name = instance.image.name
+    if name:
+        transaction.on_commit(lambda: storage.unreserve(name))
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    release_after_commit(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_pages(sender, instance, **kwargs):
+    # Число комментариев видно в карточке поста во всех лентах.
+    post = Post.objects.filter(pk=instance.post_id).values(
+        'author_id', 'group_id'
+    ).first()
+    if post is not None:
+        cache.bump(*pagecache.post_tags(instance.post_id, **post))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_profile_pages(sender, instance, **kwargs):
+    # Счётчики подписок в карточках обоих пользователей.
+    cache.bump(f'author:{instance.author_id}', f'author:{instance.user_id}')
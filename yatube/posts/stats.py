@@ -0,0 +1,92 @@
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import Comment, Follow, Post, User, UserStats
+
+CHUNK_SIZE = 500
+
+
+def bump(user_id, **deltas):
+    """Сдвигает счётчики пользователя одним UPDATE без чтения строки.
+
+    Строки нет только у пользователя, которого удаляют, или если счётчики
+    ещё не собраны - её создаст ``stats_for`` или ``rebuild``. Счётчик,
+    разошедшийся с таблицами после импорта или удаления в обход сигналов,
+    не уходит ниже нуля: поля беззнаковые.
+    """
+    UserStats.objects.filter(user_id=user_id).update(**{
+        name: Greatest(F(name) + delta, 0)
+        for name, delta in deltas.items()
+    })
+
+
+def _counts(queryset, field, user_ids):
+    return dict(
+        queryset.filter(**{f'{field}__in': user_ids})
+        .order_by()
+        .values_list(field)
+        .annotate(Count('pk'))
+    )
+
+
+def _collect(user_ids):
+    """Счётчики ``{user_id: {поле: число}}`` по таблицам."""
+    counts = {
+        'followers': _counts(Follow.objects, 'author_id', user_ids),
+        'following': _counts(Follow.objects, 'user_id', user_ids),
+        'posts': _counts(Post.objects, 'author_id', user_ids),
+        'comments': _counts(Comment.objects, 'author_id', user_ids),
+    }
+    return {
+        user_id: {
+            name: values.get(user_id, 0) for name, values in counts.items()
+        }
+        for user_id in user_ids
+    }
+
+
+def _rebuild_chunk(user_ids):
+    counts = _collect(user_ids)
+    with transaction.atomic():
+        existing = UserStats.objects.filter(user_id__in=user_ids)
+        # Отметка не счётчик: по таблицам её не восстановить.
+        pending = set(existing.filter(
+            timeline_pending=True
+        ).values_list('user_id', flat=True))
+        existing.delete()
+        UserStats.objects.bulk_create(
+            UserStats(
+                user_id=user_id,
+                timeline_pending=user_id in pending,
+                **counts[user_id]
+            )
+            for user_id in user_ids
+        )
+
+
+def rebuild(user_ids=None):
+    """Пересчитывает счётчики с нуля; без аргумента - для всех."""
+    users = User.objects.order_by('pk')
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    chunk = []
+    for user_id in users.values_list('pk', flat=True).iterator():
+        chunk.append(user_id)
+        if len(chunk) == CHUNK_SIZE:
+            _rebuild_chunk(chunk)
+            chunk = []
+    if chunk:
+        _rebuild_chunk(chunk)
+
+
+def stats_for(user):
+    try:
+        return UserStats.objects.get(user=user)
+    except UserStats.DoesNotExist:
+        # Два запроса могут собирать счётчики одновременно: строку
+        # создаст один, второй получит уже созданную.
+        stats, _ = UserStats.objects.get_or_create(
+            user=user, defaults=_collect([user.pk])[user.pk]
+        )
+        return stats
@@ -0,0 +1,197 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.core.files import locks
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils.deconstruct import deconstructible
+
+from . import images
+
+HASH_NAME_LENGTH = 64
+LOCK_NAME = '.lock'
+RESERVED_DIR = '.reserved'
+# Дольше транзакция с загрузкой не живёт: более старые брони оставлены
+# упавшими или откаченными загрузками.
+RESERVATION_TIMEOUT = 60 * 60
+
+# Брони этого процесса: имя блоба -> [(метка, время)], см. unreserve.
+_reservations = defaultdict(list)
+_reservations_lock = threading.Lock()
+
+
+def content_name(directory, digest, extension):
+    """``posts/ab/abcdef….jpg`` - имя блоба с содержимым ``digest``."""
+    return f'{directory}/{digest[:2]}/{digest}{extension.lower()}'
+
+
+def is_content_name(name):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return (
+        len(stem) == HASH_NAME_LENGTH
+        and os.path.basename(os.path.dirname(name)) == stem[:2]
+    )
+
+
+@contextmanager
+def blob_lock(path):
+    """Блокировка каталога блоба, общая для всех процессов сервера.
+
+    Под ней загрузка выбирает имя и бронирует его, а ``release``
+    проверяет ссылки и удаляет файл - одно не вклинится в другое.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_NAME), 'ab') as handle:
+        locks.lock(handle, locks.LOCK_EX)
+        try:
+            yield
+        finally:
+            locks.unlock(handle)
+
+
+def _reservation_dir(path):
+    return os.path.join(os.path.dirname(path), RESERVED_DIR)
+
+
+def _reserve(name, path):
+    # Вызывается под blob_lock.
+    directory = _reservation_dir(path)
+    os.makedirs(directory, exist_ok=True)
+    marker = os.path.join(
+        directory, f'{os.path.basename(path)}.{uuid.uuid4().hex}'
+    )
+    open(marker, 'wb').close()
+    with _reservations_lock:
+        _reservations[name].append((marker, time.time()))
+
+
+def _reserved(path):
+    """Есть ли живая бронь блоба; устаревшие метки заодно удаляются."""
+    directory = _reservation_dir(path)
+    prefix = os.path.basename(path) + '.'
+    try:
+        entries = os.listdir(directory)
+    except FileNotFoundError:
+        return False
+    deadline = time.time() - RESERVATION_TIMEOUT
+    reserved = False
+    for entry in entries:
+        if not entry.startswith(prefix):
+            continue
+        marker = os.path.join(directory, entry)
+        try:
+            if os.path.getmtime(marker) > deadline:
+                reserved = True
+            else:
+                os.unlink(marker)
+        except FileNotFoundError:
+            pass
+    return reserved
+
+
+def unreserve(name):
+    """Снимает одну бронь, выданную этим процессом при сохранении ``name``.
+
+    Вызывать после коммита транзакции, записавшей ссылку на блоб.
+    """
+    with _reservations_lock:
+        markers = _reservations.get(name)
+        if not markers:
+            return
+        # Последняя бронь - от только что закоммиченной загрузки; старые
+        # остались от откатов и уже ничего не держат.
+        marker, _ = markers.pop()
+        deadline = time.time() - RESERVATION_TIMEOUT
+        markers[:] = [item for item in markers if item[1] > deadline]
+        if not markers:
+            del _reservations[name]
+    try:
+        os.unlink(marker)
+    except FileNotFoundError:
+        pass
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит каждое содержимое один раз - под его SHA-256.
+
+    Хэш считается по ходу записи во временный файл рядом с блобами,
+    после чего файл атомарно переименовывается в имя по хэшу; если
+    такой блоб уже есть, копия просто удаляется. Одинаковые картинки
+    разных постов получают одно имя, а с ним - общие варианты карточки.
+    Удаляет блобы ``release``, когда на них не ссылается ни один пост.
+
+    Выданное имя бронируется до коммита поста (``unreserve``): иначе
+    ``release`` мог бы удалить уже существующий блоб, пока ссылка на
+    него ещё не видна в базе.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Имя всё равно заменяется хэшем в _save.
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1]
+        os.makedirs(self.path(directory), exist_ok=True)
+        digest = hashlib.sha256()
+        handle, temporary = tempfile.mkstemp(
+            dir=self.path(directory), suffix='.part'
+        )
+        try:
+            with os.fdopen(handle, 'wb') as part:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    part.write(chunk)
+            name = content_name(directory, digest.hexdigest(), extension)
+            full_path = self.path(name)
+            with blob_lock(full_path):
+                if os.path.exists(full_path):
+                    os.unlink(temporary)
+                else:
+                    if self.file_permissions_mode is not None:
+                        os.chmod(temporary, self.file_permissions_mode)
+                    os.replace(temporary, full_path)
+                _reserve(name, full_path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+            raise
+        return name
+
+
+def delete_variants(name):
+    directory = images.variants_dir(name)
+    if default_storage.exists(directory):
+        for variant in default_storage.listdir(directory)[1]:
+            default_storage.delete(f'{directory}/{variant}')
+
+
+def release(name, storage=None):
+    """Удаляет блоб и его варианты, если на него не ссылается ни один пост.
+
+    Вызывать после коммита транзакции, которая убрала ссылку. Блоб,
+    выданный ещё не закоммиченной загрузке, остаётся на месте (если та
+    откатится, файл останется без ссылок).
+    """
+    Post = apps.get_model('posts', 'Post')
+    # Файлы со старыми именами мог делить кто угодно - их не трогаем.
+    if not is_content_name(name):
+        return False
+    storage = storage or Post._meta.get_field('image').storage
+    with blob_lock(storage.path(name)):
+        if (
+            _reserved(storage.path(name))
+            or Post.objects.filter(image=name).exists()
+        ):
+            return False
+        storage.delete(name)
+        delete_variants(name)
+    return True
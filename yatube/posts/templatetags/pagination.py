@@ -0,0 +1,20 @@
+from django import template
+
+from posts.paginator import WindowPaginator
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page, on_each_side=3, on_ends=1):
+    """``{% page_window page as pages %}`` - номера страниц для навигации.
+
+    Первая, последняя и ``on_each_side`` страниц вокруг текущей; вместо
+    пропусков - ``WindowPaginator.ELLIPSIS``.
+    """
+    paginator = page.paginator
+    if not isinstance(paginator, WindowPaginator):
+        return paginator.page_range
+    return list(paginator.get_elided_page_range(
+        page.number, on_each_side=on_each_side, on_ends=on_ends
+    ))
@@ -0,0 +1,32 @@
+import re
+
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import follows
+
+register = template.Library()
+
+OWNER_BLOCK = re.compile(r'<!--owner:(\d+)-->(.*?)<!--/owner-->', re.S)
+
+
+@register.filter(is_safe=True)
+def owner_links(html, user_id):
+    """Оставляет в общем для всех фрагменте только кнопки владельца.
+
+    Карточки с ``owner_marks`` выводят кнопки автора всегда, обернув их
+    в ``<!--owner:id-->...<!--/owner-->``; фильтр убирает чужие блоки уже
+    после кэша, так что сам фрагмент не зависит от пользователя.
+    """
+    owner = str(user_id)
+
+    def keep(match):
+        return match.group(2) if match.group(1) == owner else ''
+
+    return mark_safe(OWNER_BLOCK.sub(keep, html))
+
+
+@register.filter
+def followed_by(author_id, user):
+    """``{% if post.author_id|followed_by:user %}`` - без SQL на карточку."""
+    return author_id in follows.followed_authors(user)
@@ -0,0 +1,63 @@
+import json
+
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from posts import images
+
+register = template.Library()
+
+# Ширина карточки в ленте при ширинах контейнера Bootstrap 4.
+CARD_SIZES = (
+    '(min-width: 1200px) 1110px, (min-width: 992px) 930px, '
+    '(min-width: 768px) 690px, (min-width: 576px) 510px, 100vw'
+)
+
+
+def _srcset(variants):
+    return ', '.join(
+        f"{default_storage.url(variant['name'])} {variant['width']}w"
+        for variant in variants
+    )
+
+
+@register.simple_tag
+def responsive_image(post, sizes=CARD_SIZES):
+    """``{% responsive_image post %}`` - кадр карточки с srcset.
+
+    Берёт готовые варианты из ``post.image_variants`` и не обращается
+    к хранилищу. Пока варианты не построены, показывает исходник.
+    """
+    if not post.image:
+        return ''
+    if not post.image_variants:
+        return format_html(
+            '<img class="card-img" src="{}" loading="lazy" '
+            'style="height: {}px; object-fit: cover;">',
+            post.image.url, images.CARD_SIZE[1]
+        )
+    by_format = {}
+    for variant in json.loads(post.image_variants):
+        by_format.setdefault(variant['format'], []).append(variant)
+    *modern, fallback = images.VARIANT_FORMATS
+    fallback_variants = by_format[fallback]
+    # В src - ширина карточки по умолчанию для браузеров без srcset.
+    default = min(
+        fallback_variants,
+        key=lambda variant: abs(variant['width'] - images.CARD_SIZE[0])
+    )
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (images.CONTENT_TYPES[image_format],
+             _srcset(by_format[image_format]), sizes)
+            for image_format in modern if image_format in by_format
+        )
+    )
+    return format_html(
+        '<picture>{}<img class="card-img" src="{}" srcset="{}" sizes="{}" '
+        'width="{}" height="{}" loading="lazy" alt=""></picture>',
+        sources, default_storage.url(default['name']),
+        _srcset(fallback_variants), sizes, default['width'], default['height']
+    )
@@ -0,0 +1,29 @@
+from django import template
+
+from posts import follows
+from posts.models import Recommendation
+
+register = template.Library()
+
+SHOWN = 5
+
+
+@register.inclusion_tag('includes/recommendations.html', takes_context=True)
+def who_to_follow(context, limit=SHOWN):
+    """``{% who_to_follow %}`` - кандидаты из ``build_recommendations``.
+
+    Один запрос по индексу (user, -score); тех, на кого зритель успел
+    подписаться после пересчёта, отсеивает граф подписок без SQL.
+    """
+    user = context['user']
+    if not user.is_authenticated:
+        return {'recommendations': []}
+    followed = follows.followed_authors(user)
+    # С запасом на подписки, сделанные после пересчёта.
+    candidates = Recommendation.objects.filter(
+        user=user
+    ).select_related('candidate').order_by('-score')[:limit * 2]
+    return {'recommendations': [
+        recommendation for recommendation in candidates
+        if recommendation.candidate_id not in followed
+    ][:limit]}
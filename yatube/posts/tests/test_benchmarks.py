@@ -0,0 +1,46 @@
+import copy
+
+from django.test import TestCase
+
+from ..benchmarks import cards, runner, seed
+from ..models import Timeline
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.dataset = seed.seed(60, users=10, groups=2)
+
+    def test_seed_builds_derived_tables(self):
+        self.assertEqual(self.dataset['posts'], 60)
+        self.assertEqual(self.dataset['users'], 10)
+        self.assertGreater(self.dataset['follows'], 0)
+        self.assertTrue(Timeline.objects.exists())
+
+    def test_report_covers_views(self):
+        views = runner.run(repeat=2)
+        self.assertEqual(
+            set(views),
+            {'index', 'index_deep', 'follow_index', 'group_posts',
+             'profile', 'post_view'}
+        )
+        for metrics in views.values():
+            self.assertGreater(metrics['queries'], 0)
+            self.assertGreater(metrics['wall_p50_ms'], 0)
+            self.assertGreater(metrics['template_ms'], 0)
+
+    def test_card_benchmark(self):
+        result = cards.run(repeat=2)
+        self.assertEqual(result['cards'], 10)
+        self.assertGreater(result['include_p50_ms'], 0)
+        self.assertGreater(result['render_cards_p50_ms'], 0)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'views': runner.run(repeat=1)}
+        report = copy.deepcopy(baseline)
+        self.assertEqual(runner.compare(report, baseline), [])
+        report['views']['index']['queries'] += 1
+        report['views']['profile']['wall_p50_ms'] += 100
+        regressions = runner.compare(report, baseline)
+        self.assertEqual(len(regressions), 2)
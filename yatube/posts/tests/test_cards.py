@@ -0,0 +1,79 @@
+from django.contrib.auth.models import AnonymousUser
+from django.template import engines
+from django.test import RequestFactory, TestCase
+
+from ..benchmarks import cards
+from ..models import Group, Post, User
+
+
+class RenderCardsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='автор.1+x')
+        cls.reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(title='Группа', slug='group')
+        for number in range(4):
+            Post.objects.create(
+                text=f'Пост <b>{number}</b>\nвторая строка',
+                author=cls.author,
+                group=group if number % 2 else None,
+            )
+
+    def render(self, source, user, **context):
+        request = RequestFactory().get('/')
+        request.user = user
+        context['posts'] = list(Post.objects.for_listing())
+        return engines['django'].from_string(source).render(context, request)
+
+    def test_byte_identical_to_include_loop(self):
+        for user in (AnonymousUser(), self.reader, self.author):
+            for extra in ('', ' owner_marks=True'):
+                with self.subTest(user=user, extra=extra):
+                    include_loop = self.render(
+                        '{% for post in posts %}'
+                        '{% include "includes/card_post.html" with '
+                        f'post=post{extra} %}}'
+                        '{% endfor %}',
+                        user
+                    )
+                    render_cards = self.render(
+                        f'{{% load post_cards %}}'
+                        f'{{% render_cards posts{extra} %}}',
+                        user
+                    )
+                    self.assertEqual(render_cards, include_loop)
+                    self.assertEqual(include_loop.count('class="card '), 4)
+
+    def test_context_is_restored(self):
+        html = self.render(
+            '{% load post_cards %}{% render_cards posts owner_marks=True %}'
+            '[{{ post }}|{{ owner_marks }}]',
+            self.reader, post='снаружи'
+        )
+        self.assertTrue(html.endswith('[снаружи|]'))
+
+    def test_card_url_matches_url_tag(self):
+        post = Post.objects.select_related('author').first()
+        for view_name, args in (
+            ('profile', 'post.author.username'),
+            ('post_view', 'post.author.username post.id'),
+            ('post_edit', 'post.author.username post.id'),
+            ('group_posts', "'group'"),
+        ):
+            with self.subTest(view_name=view_name):
+                self.assertEqual(
+                    self.render(
+                        f"{{% load post_cards %}}"
+                        f"{{% card_url '{view_name}' {args} %}}",
+                        self.reader, post=post
+                    ),
+                    self.render(
+                        f"{{% url '{view_name}' {args} %}}",
+                        self.reader, post=post
+                    )
+                )
+
+    def test_benchmark_checks_identity(self):
+        result = cards.run(repeat=1)
+        self.assertEqual(result['cards'], 4)
@@ -0,0 +1,115 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, User
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст', author=cls.author, group=cls.group
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def urls(self):
+        return [
+            reverse('index'),
+            reverse('group_posts', kwargs={'slug': self.group.slug}),
+            reverse('profile', kwargs={'username': self.author.username}),
+            reverse('post_view', kwargs={
+                'username': self.author.username, 'post_id': self.post.pk
+            }),
+            reverse('follow_index'),
+        ]
+
+    def etags(self, client):
+        # Форма комментария ставит CSRF-cookie, а он входит в ETag.
+        client.get(self.urls()[3])
+        etags = {}
+        for url in self.urls():
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            etags[url] = response['ETag']
+        return etags
+
+    def test_not_modified_without_rendering(self):
+        for url, etag in self.etags(self.reader_client).items():
+            with self.subTest(url=url):
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+
+    def test_etag_depends_on_viewer(self):
+        reader = self.etags(self.reader_client)
+        author = self.etags(self.author_client)
+        for url in self.urls():
+            with self.subTest(url=url):
+                self.assertNotEqual(reader[url], author[url])
+
+    def assertAllChanged(self, before):
+        after = self.etags(self.reader_client)
+        for url in self.urls():
+            with self.subTest(url=url):
+                self.assertNotEqual(before[url], after[url])
+
+    def test_new_post_changes_validators(self):
+        before = self.etags(self.reader_client)
+        self.author_client.post(
+            reverse('new_post'), {'text': 'Новый', 'group': self.group.pk}
+        )
+        self.assertAllChanged(before)
+
+    def test_edit_changes_validators(self):
+        before = self.etags(self.reader_client)
+        self.author_client.post(
+            reverse('post_edit', kwargs={
+                'username': self.author.username, 'post_id': self.post.pk
+            }),
+            {'text': 'Исправленный текст', 'group': self.group.pk}
+        )
+        self.assertAllChanged(before)
+
+    def test_comment_changes_validators(self):
+        before = self.etags(self.reader_client)
+        self.reader_client.post(
+            reverse('add_comment', kwargs={
+                'username': self.author.username, 'post_id': self.post.pk
+            }),
+            {'text': 'Комментарий'}
+        )
+        self.assertAllChanged(before)
+
+    def test_follow_changes_profile(self):
+        url = reverse('profile', kwargs={'username': self.reader.username})
+        etag = self.author_client.get(url)['ETag']
+        self.author_client.get(
+            reverse('profile_follow', kwargs={'username': 'reader'})
+        )
+        response = self.author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_post_is_not_found(self):
+        response = self.reader_client.get(
+            reverse('post_view', kwargs={
+                'username': self.reader.username, 'post_id': self.post.pk
+            }),
+            HTTP_IF_NONE_MATCH='"anything"'
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,151 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+def read_ndjson(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as source:
+        return [json.loads(line) for line in source]
+
+
+class ExportMixin:
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def create_content(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.old = Post.objects.create(text='Старый', author=self.author)
+        Post.objects.filter(pk=self.old.pk).update(
+            pub_date=timezone.now() - timedelta(days=10)
+        )
+        self.posts = [self.old] + [
+            Post.objects.create(
+                text=f'Пост {i}', author=self.author, group=self.group
+            )
+            for i in range(4)
+        ]
+        Comment.objects.create(
+            text='Комментарий', author=self.reader, post=self.posts[1]
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def export(self, *args):
+        out = StringIO()
+        call_command('export_content', self.directory, *args, stdout=out)
+        with open(os.path.join(self.directory, 'manifest.json')) as source:
+            return json.load(source)
+
+
+class ExportContentTests(ExportMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_content()
+
+    def test_ndjson(self):
+        manifest = self.export('--chunk-size', '2')
+        self.assertEqual(manifest['tables']['posts']['rows'], 5)
+        posts = read_ndjson(os.path.join(self.directory, 'posts.ndjson.gz'))
+        self.assertEqual(
+            [post['id'] for post in posts],
+            [post.pk for post in self.posts]
+        )
+        self.assertEqual(posts[1]['author'], 'author')
+        self.assertEqual(posts[1]['group'], 'group')
+        follows = read_ndjson(
+            os.path.join(self.directory, 'follows.ndjson.gz')
+        )
+        self.assertEqual(follows[0]['user'], 'reader')
+
+    def test_columnar(self):
+        manifest = self.export('--format', 'columnar', '--chunk-size', '2',
+                               '--tables', 'posts')
+        files = manifest['tables']['posts']['files']
+        self.assertEqual(len(files), 3)
+        with gzip.open(os.path.join(self.directory, files[0]), 'rt') as part:
+            data = json.load(part)
+        self.assertEqual(data['id'], [self.posts[0].pk, self.posts[1].pk])
+        self.assertEqual(data['text'], ['Старый', 'Пост 0'])
+
+    def test_since_and_incremental(self):
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        manifest = self.export('--since', since)
+        self.assertEqual(manifest['tables']['posts']['rows'], 4)
+        self.assertEqual(manifest['tables']['follows']['rows'], 1)
+        previous = os.path.join(self.directory, 'previous.json')
+        shutil.copy(os.path.join(self.directory, 'manifest.json'), previous)
+
+        new_post = Post.objects.create(text='Новый', author=self.author)
+        manifest = self.export('--incremental', previous)
+        self.assertEqual(manifest['tables']['follows']['rows'], 0)
+        posts = read_ndjson(os.path.join(self.directory, 'posts.ndjson.gz'))
+        self.assertIn(new_post.pk, [post['id'] for post in posts])
+        self.assertNotIn(self.old.pk, [post['id'] for post in posts])
+
+    def test_incremental_has_no_duplicates_at_boundary(self):
+        manifest = self.export()
+        previous = os.path.join(self.directory, 'previous.json')
+        shutil.copy(os.path.join(self.directory, 'manifest.json'), previous)
+        self.assertEqual(
+            manifest['tables']['posts']['max_date_id'], self.posts[-1].pk
+        )
+        # Новый пост с той же датой, что у последнего выгруженного.
+        tied = Post.objects.create(text='Та же дата', author=self.author)
+        Post.objects.filter(pk=tied.pk).update(
+            pub_date=self.posts[-1].pub_date
+        )
+        manifest = self.export('--incremental', previous)
+        posts = read_ndjson(os.path.join(self.directory, 'posts.ndjson.gz'))
+        self.assertEqual([post['id'] for post in posts], [tied.pk])
+        self.assertEqual(manifest['tables']['comments']['rows'], 0)
+        shutil.copy(os.path.join(self.directory, 'manifest.json'), previous)
+        manifest = self.export('--incremental', previous)
+        self.assertEqual(manifest['tables']['posts']['rows'], 0)
+
+    def test_round_trip_through_import(self):
+        self.export()
+        expected = list(Post.objects.values_list(
+            'pk', 'text', 'author__username', 'group__slug', 'pub_date'
+        ))
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        Follow.objects.all().delete()
+        for table in ('groups', 'posts', 'comments', 'follows'):
+            call_command(
+                'import_content', table,
+                os.path.join(self.directory, f'{table}.ndjson.gz'),
+                '--no-rebuild', stdout=StringIO()
+            )
+        self.assertEqual(list(Post.objects.values_list(
+            'pk', 'text', 'author__username', 'group__slug', 'pub_date'
+        )), expected)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+
+
+class ParallelExportTests(ExportMixin, TransactionTestCase):
+    def test_tables_in_threads(self):
+        self.create_content()
+        manifest = self.export('--jobs', '4')
+        rows = {
+            name: entry['rows'] for name, entry in manifest['tables'].items()
+        }
+        self.assertEqual(
+            rows, {'groups': 1, 'posts': 5, 'comments': 1, 'follows': 1}
+        )
@@ -0,0 +1,128 @@
+from array import array
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.template import engines
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import cache as posts_cache, follows
+from ..models import Follow, User
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(5)
+        ]
+        for author in cls.authors[1:4]:
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def fresh_reader(self):
+        # Новый объект пользователя - как в следующем запросе.
+        return User.objects.get(pk=self.reader.pk)
+
+    def test_loaded_once_then_no_sql(self):
+        reader = self.fresh_reader()
+        with CaptureQueriesContext(connection) as queries:
+            followed = follows.followed_authors(reader)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            {author.pk for author in self.authors if author.pk in followed},
+            {author.pk for author in self.authors[1:4]}
+        )
+        reader = self.fresh_reader()
+        with self.assertNumQueries(0):
+            follows.followed_authors(reader)
+
+    def test_stored_as_sorted_array(self):
+        follows.followed_authors(self.fresh_reader())
+        version = posts_cache.version(follows._tag(self.reader.pk))
+        ids = follows._cached(self.reader.pk, version)
+        self.assertEqual(
+            list(ids), sorted(author.pk for author in self.authors[1:4])
+        )
+
+    def test_anonymous_follows_nobody(self):
+        with self.assertNumQueries(0):
+            self.assertNotIn(
+                self.authors[1].pk, follows.followed_authors(AnonymousUser())
+            )
+
+    def test_profile_has_no_follow_query(self):
+        follows.followed_authors(self.fresh_reader())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('profile', args=['author1']))
+        self.assertTrue(response.context['following'])
+        self.assertFalse(any(
+            'posts_follow' in query['sql'] for query in queries
+        ))
+        response = self.client.get(reverse('profile', args=['author4']))
+        self.assertFalse(response.context['following'])
+
+    def test_followed_by_filter_for_a_page_of_authors(self):
+        template = engines['django'].from_string(
+            '{% load post_filters %}{% for author in authors %}'
+            '{% if author.pk|followed_by:user %}+{% else %}-{% endif %}'
+            '{% endfor %}'
+        )
+        reader = self.fresh_reader()
+        follows.followed_authors(reader)
+        with self.assertNumQueries(0):
+            html = template.render({'authors': self.authors, 'user': reader})
+        self.assertEqual(html, '-+++-')
+
+
+class FollowGraphInvalidationTests(TransactionTestCase):
+    # Список сбрасывается в on_commit, которого нет внутри TestCase.
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader')
+        self.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(3)
+        ]
+        Follow.objects.create(user=self.reader, author=self.authors[2])
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def fresh_reader(self):
+        return User.objects.get(pk=self.reader.pk)
+
+    def test_follow_and_unfollow_reload_after_commit(self):
+        follows.followed_authors(self.fresh_reader())
+        self.client.get(reverse('profile_follow', args=['author0']))
+        self.client.get(reverse('profile_unfollow', args=['author2']))
+        reader = self.fresh_reader()
+        with self.assertNumQueries(1):
+            followed = follows.followed_authors(reader)
+        self.assertIn(self.authors[0].pk, followed)
+        self.assertNotIn(self.authors[2].pk, followed)
+        self.assertEqual(len(followed), 1)
+        reader = self.fresh_reader()
+        with self.assertNumQueries(0):
+            follows.followed_authors(reader)
+
+    def test_snapshot_read_before_commit_is_not_served(self):
+        # Чтение взяло версию и список до коммита подписки, а записало
+        # их в кэш уже после него.
+        version = posts_cache.version(follows._tag(self.reader.pk))
+        Follow.objects.create(user=self.reader, author=self.authors[1])
+        cache.set(
+            follows.FOLLOWING_KEY % (self.reader.pk, version),
+            array(follows.TYPECODE, [self.authors[2].pk]).tobytes()
+        )
+        self.assertIn(
+            self.authors[1].pk, follows.followed_authors(self.fresh_reader())
+        )
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 from http import HTTPStatus
@@ -81,7 +82,8 @@ class PostFormTests(TestCase):
         self.assertEqual(response.status_code, HTTPStatus.OK)
         self.assertRedirects(response, reverse('index'))
         self.assertEqual(last_post.text, form_data['text'])
-        short_name = f'posts/{form_data["image"].name}'
+        digest = hashlib.sha256(small_gif).hexdigest()
+        short_name = f'posts/{digest[:2]}/{digest}.gif'
         self.assertEqual(last_post.image.name, short_name)
         self.assertEqual(last_post.group.id, form_data['group'])
 
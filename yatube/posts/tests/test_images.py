@@ -0,0 +1,96 @@
+from io import BytesIO, StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import images
+from ..models import Post, User
+from .utils import TempMediaMixin
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def camera_jpeg(width, height, orientation=6):
+    """JPEG как с телефона: повёрнут тегом EXIF и с моделью камеры."""
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    exif[0x0110] = 'Test Camera'
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), (200, 30, 30)).save(
+        buffer, 'JPEG', exif=exif.tobytes(), quality=95
+    )
+    return buffer.getvalue()
+
+
+@override_settings(
+    POST_IMAGE_MAX_SIZE=(400, 400),
+    POST_IMAGE_KEEP_BYTES=1024,
+)
+class ImageNormalizeTests(TempMediaMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    def setUp(self):
+        super().setUp()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_camera_photo_is_rotated_shrunk_and_stripped(self):
+        content = camera_jpeg(1200, 800)
+        upload = SimpleUploadedFile('photo.JPG', content, 'image/jpeg')
+        result, original_size = images.normalize(upload)
+        self.assertEqual(original_size, len(content))
+        self.assertEqual(result.name, 'photo.webp')
+        with Image.open(result) as image:
+            self.assertEqual(image.format, 'WEBP')
+            # Тег 6 - поворот на 90°: альбомный кадр становится портретным.
+            self.assertEqual(image.size, (267, 400))
+            self.assertFalse(image.getexif())
+        self.assertLess(result.size, original_size)
+
+    def test_small_clean_image_is_kept(self):
+        upload = SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        result, original_size = images.normalize(upload)
+        self.assertIs(result, upload)
+        self.assertEqual(original_size, len(SMALL_GIF))
+
+    def test_animation_is_kept(self):
+        frames = [
+            Image.new('RGB', (600, 600), color)
+            for color in ('red', 'green', 'blue')
+        ]
+        buffer = BytesIO()
+        frames[0].save(
+            buffer, 'GIF', save_all=True, append_images=frames[1:]
+        )
+        upload = SimpleUploadedFile(
+            'anim.gif', buffer.getvalue(), 'image/gif'
+        )
+        result, _ = images.normalize(upload)
+        self.assertIs(result, upload)
+
+    def test_form_records_sizes(self):
+        content = camera_jpeg(1200, 800)
+        self.authorized_client.post(reverse('new_post'), data={
+            'text': 'Фото',
+            'image': SimpleUploadedFile('photo.jpg', content, 'image/jpeg'),
+        })
+        post = Post.objects.get(text='Фото')
+        self.assertTrue(post.image.name.endswith('.webp'))
+        self.assertEqual(post.image_original_size, len(content))
+        self.assertEqual(post.image_size, post.image.size)
+        out = StringIO()
+        call_command('image_report', stdout=out)
+        self.assertIn('Картинок: 1, перекодировано: 1', out.getvalue())
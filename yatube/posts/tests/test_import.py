@@ -0,0 +1,145 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from ..models import (
+    Comment, Follow, Group, Post, Timeline, User, UserStats
+)
+
+
+class ImportContentTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8') as target:
+            target.write(content)
+        return path
+
+    def write_ndjson(self, name, rows):
+        return self.write(
+            name, ''.join(json.dumps(row) + '\n' for row in rows)
+        )
+
+    def run_import(self, kind, path, *args):
+        out = StringIO()
+        call_command('import_content', kind, path, *args, stdout=out)
+        return out.getvalue()
+
+    def import_users(self):
+        self.run_import('users', self.write(
+            'users.csv',
+            'username,email,date_joined\n'
+            'leo,leo@example.com,2020-01-01T10:00:00+00:00\n'
+            'anna,,\n'
+        ))
+
+    def test_import_everything(self):
+        self.import_users()
+        self.run_import('groups', self.write_ndjson('groups.ndjson', [
+            {'slug': 'cats', 'title': 'Котики'},
+        ]))
+        self.run_import('posts', self.write_ndjson('posts.ndjson.gz', [
+            {'id': 100, 'author': 'leo', 'group': 'cats', 'text': 'Мяу',
+             'pub_date': '2021-05-01T12:00:00+00:00'},
+            {'id': 101, 'author': 'anna', 'text': 'Привет'},
+            {'id': 102, 'author': 'nobody', 'text': 'Потерянный'},
+        ]))
+        self.run_import('comments', self.write_ndjson('comments.ndjson', [
+            {'post': 100, 'author': 'anna', 'text': 'Красиво'},
+            {'post': 999, 'author': 'anna', 'text': 'Не туда'},
+        ]))
+        output = self.run_import('follows', self.write_ndjson(
+            'follows.ndjson', [
+                {'user': 'anna', 'author': 'leo'},
+                {'user': 'anna', 'author': 'leo'},
+                {'user': 'leo', 'author': 'leo'},
+            ]
+        ))
+        self.assertIn('строк/с', output)
+
+        leo = User.objects.get(username='leo')
+        self.assertEqual(leo.email, 'leo@example.com')
+        self.assertEqual(leo.date_joined.year, 2020)
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.author, leo)
+        self.assertEqual(post.group, Group.objects.get(slug='cats'))
+        self.assertEqual(post.pub_date.year, 2021)
+        self.assertFalse(Post.objects.filter(pk=102).exists())
+        self.assertEqual(Comment.objects.get().post, post)
+        self.assertEqual(Follow.objects.get().author, leo)
+        self.assertEqual(UserStats.objects.get(user=leo).followers, 1)
+        self.assertEqual(UserStats.objects.get(user=leo).posts, 1)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_heavy_author_is_not_fanned_out(self):
+        self.import_users()
+        self.run_import('users', self.write(
+            'more_users.csv', 'username,email,date_joined\nmax,,\n'
+        ))
+        self.run_import('posts', self.write_ndjson('posts.ndjson', [
+            {'id': 1, 'author': 'leo', 'text': 'У leo два подписчика'},
+            {'id': 2, 'author': 'anna', 'text': 'У anna один'},
+        ]))
+        self.run_import('follows', self.write_ndjson('follows.ndjson', [
+            {'user': 'anna', 'author': 'leo'},
+            {'user': 'max', 'author': 'leo'},
+            {'user': 'leo', 'author': 'anna'},
+        ]))
+        self.assertFalse(Timeline.objects.filter(post_id=1).exists())
+        self.assertEqual(
+            list(Timeline.objects.values_list('user__username', 'post_id')),
+            [('leo', 2)]
+        )
+
+    def test_repeated_import_is_ignored(self):
+        self.import_users()
+        path = self.write(
+            'again.csv', 'username,email,date_joined\nleo,,\nmax,,\n'
+        )
+        output = self.run_import('users', path)
+        self.assertEqual(User.objects.count(), 3)
+        self.assertIn('users: принято 1, пропущено 1', output)
+        output = self.run_import('users', path)
+        self.assertIn('users: принято 0, пропущено 2', output)
+
+    def test_resume_from_checkpoint(self):
+        self.import_users()
+        rows = [
+            {'id': number, 'author': 'leo', 'text': f'Пост {number}'}
+            for number in range(1, 8)
+        ]
+        path = self.write_ndjson('posts.ndjson', rows)
+        checkpoint = os.path.join(self.directory, 'posts.checkpoint')
+        with open(checkpoint, 'w') as target:
+            json.dump({'kind': 'posts', 'path': path, 'rows': 4}, target)
+        output = self.run_import(
+            'posts', path, '--checkpoint', checkpoint, '--chunk-size', '2'
+        )
+        self.assertIn('Продолжение с 4-й строки', output)
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('pk', flat=True)),
+            [5, 6, 7]
+        )
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_broken_row_stops_import(self):
+        self.import_users()
+        path = self.write_ndjson('posts.ndjson', [
+            {'author': 'leo', 'text': 'Есть'},
+            {'author': 'leo'},
+        ])
+        with self.assertRaises(CommandError):
+            self.run_import('posts', path)
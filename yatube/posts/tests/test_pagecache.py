@@ -0,0 +1,162 @@
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+from ..pagecache import AnonymousPageCacheMiddleware, tag
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа', slug='other', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст', author=cls.author, group=cls.group
+        )
+        Post.objects.create(
+            text='Чужой пост', author=cls.other, group=cls.other_group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def url(self, name, **kwargs):
+        return reverse(name, kwargs=kwargs)
+
+    def urls(self):
+        return {
+            'index': self.url('index'),
+            'group': self.url('group_posts', slug='group'),
+            'other_group': self.url('group_posts', slug='other'),
+            'author': self.url('profile', username='author'),
+            'other': self.url('profile', username='other'),
+            'post': self.url(
+                'post_view', username='author', post_id=self.post.pk
+            ),
+        }
+
+    def warm(self):
+        for url in self.urls().values():
+            self.guest_client.get(url)
+
+    def assertCached(self, *names):
+        urls = self.urls()
+        for name in names:
+            with self.subTest(page=name), self.assertNumQueries(0):
+                response = self.guest_client.get(urls[name])
+                self.assertEqual(response.status_code, 200)
+
+    def assertRendered(self, *names):
+        urls = self.urls()
+        for name in names:
+            with self.subTest(page=name):
+                response = self.guest_client.get(urls[name])
+                self.assertIsNotNone(response.context)
+
+    def test_hits_skip_orm_and_templates(self):
+        self.warm()
+        self.assertCached(*self.urls())
+
+    def test_logged_in_users_bypass(self):
+        self.warm()
+        client = Client()
+        client.force_login(self.other)
+        response = client.get(self.urls()['index'])
+        self.assertIsNotNone(response.context)
+
+    def test_query_string_is_part_of_key(self):
+        self.warm()
+        response = self.guest_client.get(self.urls()['index'] + '?page=2')
+        self.assertIsNotNone(response.context)
+
+    def test_not_modified_from_cache(self):
+        self.warm()
+        etag = self.guest_client.get(self.urls()['index'])['ETag']
+        response = self.guest_client.get(
+            self.urls()['index'], HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_post_purges_its_pages_only(self):
+        self.warm()
+        Post.objects.create(text='Новый', author=self.author, group=self.group)
+        # На странице поста карточка автора с числом его постов.
+        self.assertRendered('index', 'group', 'author', 'post')
+        self.assertCached('other_group', 'other')
+
+    def test_comment_purges_post_pages(self):
+        self.warm()
+        Comment.objects.create(
+            text='Комментарий', author=self.other, post=self.post
+        )
+        self.assertRendered('index', 'group', 'author', 'post')
+        self.assertCached('other_group', 'other')
+
+    def test_moving_post_purges_old_group(self):
+        self.warm()
+        self.post.group = self.other_group
+        self.post.save()
+        self.assertRendered('group', 'other_group', 'author', 'post')
+
+    def test_follow_purges_both_profiles(self):
+        self.warm()
+        Follow.objects.create(user=self.other, author=self.author)
+        self.assertRendered('author', 'other', 'post')
+        self.assertCached('index', 'group', 'other_group')
+
+
+class AnonymousPageCacheMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        self.factory = RequestFactory()
+
+    def get_response(self, request):
+        self.calls += 1
+        response = tag(HttpResponse('страница'), 'feed')
+        if request.GET.get('cookie'):
+            response.set_cookie('csrftoken', 'token')
+        return response
+
+    def get(self, path, **extra):
+        middleware = AnonymousPageCacheMiddleware(self.get_response)
+        return middleware(self.factory.get(path, **extra))
+
+    def test_stores_tagged_pages(self):
+        self.get('/page/')
+        response = self.get('/page/')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(response.content.decode(), 'страница')
+
+    def test_skips_responses_with_cookies(self):
+        self.get('/page/?cookie=1')
+        self.get('/page/?cookie=1')
+        self.assertEqual(self.calls, 2)
+
+    def test_skips_session_requests(self):
+        self.get('/page/', HTTP_COOKIE='sessionid=abc')
+        self.get('/page/', HTTP_COOKIE='sessionid=abc')
+        self.assertEqual(self.calls, 2)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }})
+    def test_disabled_without_shared_cache(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            AnonymousPageCacheMiddleware(self.get_response)
+
+    @override_settings(ANONYMOUS_PAGE_CACHE_TIMEOUT=0)
+    def test_disabled_with_zero_timeout(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            AnonymousPageCacheMiddleware(self.get_response)
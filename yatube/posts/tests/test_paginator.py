@@ -0,0 +1,131 @@
+import base64
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls.base import reverse
+from django.utils import timezone
+
+from ..models import Post, User
+from ..paginator import CursorPaginator, WindowPaginator
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        for i in range(13):
+            Post.objects.create(text=f'Пост {i}', author=cls.user)
+        # Половина постов с одинаковой датой: порядок держится на id.
+        Post.objects.filter(pk__lte=6).update(pub_date=timezone.now())
+        cls.expected = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_forward_and_backward(self):
+        paginator = CursorPaginator(Post.objects.all(), 5)
+        first = paginator.get_page()
+        self.assertFalse(first.has_previous())
+        second = paginator.get_page(after=first.next_cursor)
+        third = paginator.get_page(after=second.next_cursor)
+        self.assertFalse(third.has_next())
+        self.assertEqual(
+            list(first) + list(second) + list(third),
+            self.expected
+        )
+        back = paginator.get_page(before=third.previous_cursor)
+        self.assertEqual(list(back), list(second))
+        back = paginator.get_page(before=back.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_broken_cursor_gives_first_page(self):
+        paginator = CursorPaginator(Post.objects.all(), 5)
+        page = paginator.get_page(after='не курсор')
+        self.assertEqual(list(page), self.expected[:5])
+
+    @override_settings(POSTS_PAGINATION='cursor')
+    def test_cursor_with_nulls_gives_first_page(self):
+        paginator = CursorPaginator(Post.objects.all(), 5)
+        for values in ('[null,null]', '[null,5]'):
+            cursor = base64.urlsafe_b64encode(values.encode()).decode()
+            with self.subTest(values=values):
+                self.assertIsNone(paginator.decode(cursor))
+                for direction in ('after', 'before'):
+                    response = self.authorized_client.get(
+                        reverse('index') + f'?{direction}={cursor}'
+                    )
+                    self.assertEqual(
+                        list(response.context['page']), self.expected[:10]
+                    )
+
+    @override_settings(POSTS_PAGINATION='cursor')
+    def test_views_use_cursor(self):
+        response = self.authorized_client.get(reverse('index'))
+        page = response.context['page']
+        self.assertEqual(list(page), self.expected[:10])
+        self.assertContains(response, f'?after={page.next_cursor}')
+        response = self.authorized_client.get(
+            reverse('index') + f'?after={page.next_cursor}'
+        )
+        self.assertEqual(list(response.context['page']), self.expected[10:])
+
+
+class WindowPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='window_user')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.user) for i in range(200)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_elided_page_range(self):
+        paginator = WindowPaginator(range(500), 10)
+        ellipsis = WindowPaginator.ELLIPSIS
+        self.assertEqual(
+            list(paginator.get_elided_page_range(1)),
+            [1, 2, 3, 4, ellipsis, 50]
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(25)),
+            [1, ellipsis, 22, 23, 24, 25, 26, 27, 28, ellipsis, 50]
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(50)),
+            [1, ellipsis, 47, 48, 49, 50]
+        )
+        self.assertEqual(
+            list(WindowPaginator(range(50), 10).get_elided_page_range(3)),
+            [1, 2, 3, 4, 5]
+        )
+
+    def test_navigation_is_windowed(self):
+        response = self.client.get(reverse('index') + '?page=10')
+        content = response.content.decode()
+        self.assertEqual(content.count('class="page-link"'), 13)
+        self.assertIn(WindowPaginator.ELLIPSIS, content)
+        self.assertIn('?page=20', content)
+        self.assertNotIn('?page=19', content)
+
+    def test_count_is_cached_until_write(self):
+        url = reverse('index') + '?page=2'
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url + '&again=1')
+        counts = [q for q in queries if 'COUNT(*) FROM' in q['sql']]
+        self.assertEqual(counts, [])
+        self.assertEqual(response.context['page'].paginator.count, 200)
+
+        Post.objects.create(text='Новый', author=self.user)
+        response = self.client.get(url + '&after_write=1')
+        self.assertEqual(response.context['page'].paginator.count, 201)
@@ -0,0 +1,132 @@
+import re
+from itertools import product
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Follow, Group, Post, TrendingPost, User
+
+# Полный проход по таблице без индекса и сортировка во временном B-дереве.
+# Проход по покрывающему индексу (COUNT(*) всей ленты) допустим. SQLite
+# до 3.36 пишет "SCAN TABLE posts_post", новые версии - "SCAN posts_post".
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+$')
+TEMP_SORT = re.compile(r'TEMP B-TREE')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for i in range(15):
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+        cls.post = Post.objects.first()
+        for i in range(25):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {i}'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        # Из закэшированного фрагмента ленты страница не читается вовсе.
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def plans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append(
+                    (query['sql'], [row[3] for row in cursor.fetchall()])
+                )
+        return plans
+
+    def assertIndexedPlans(self, url, index=None, allow_sort=False):
+        checks = [FULL_SCAN] if allow_sort else [FULL_SCAN, TEMP_SORT]
+        plans = self.plans(url)
+        for sql, steps in plans:
+            for step, check in product(steps, checks):
+                self.assertIsNone(
+                    check.search(step), f'{url}: {step}\n{sql}'
+                )
+        if index is not None:
+            used = [step for _, steps in plans for step in steps]
+            self.assertTrue(
+                any(index in step for step in used),
+                f'{url}: индекс {index} не используется'
+            )
+
+    def feed_urls(self):
+        return {
+            reverse('index'): 'post_pub_date_idx',
+            reverse('group_posts', args=[self.group.slug]):
+                'post_group_pub_date_idx',
+            reverse('profile', args=[self.author.username]):
+                'post_author_pub_date_idx',
+            reverse('follow_index'): 'timeline_user_pub_date_idx',
+            reverse('post_view', args=[self.author.username, self.post.pk]):
+                'comment_post_created_idx',
+            reverse(
+                'post_comments', args=[self.author.username, self.post.pk]
+            ): 'comment_post_created_idx',
+        }
+
+    def test_views_use_indexes(self):
+        for url, index in self.feed_urls().items():
+            with self.subTest(url=url):
+                self.assertIndexedPlans(url, index)
+                self.assertIndexedPlans(url + '?page=2')
+
+    @override_settings(POSTS_PAGINATION='cursor')
+    def test_cursor_pages_use_indexes(self):
+        for url in self.feed_urls():
+            with self.subTest(url=url):
+                self.assertIndexedPlans(url)
+                context = self.client.get(url).context
+                page = context.get('page') or context.get('comments')
+                if page is not None and page.next_cursor:
+                    self.assertIndexedPlans(
+                        f'{url}?after={page.next_cursor}'
+                    )
+                    self.assertIndexedPlans(
+                        f'{url}?before={page.next_cursor}'
+                    )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_follow_feed_with_heavy_authors(self):
+        # Посты популярных авторов домешиваются к ленте через OR, и
+        # объединение двух индексов приходится досортировывать.
+        url = reverse('follow_index')
+        self.assertIndexedPlans(url, allow_sort=True)
+        self.assertIndexedPlans(url + '?page=2', allow_sort=True)
+
+    def test_trending_pages_use_score_index(self):
+        now = timezone.now()
+        TrendingPost.objects.bulk_create(
+            TrendingPost(post=post, score=post.pk % 3, last_activity=now)
+            for post in Post.objects.all()
+        )
+        url = reverse('trending')
+        self.assertIndexedPlans(url, 'trending_score_idx')
+        cursor = self.client.get(url).context['page'].next_cursor
+        self.assertIndexedPlans(f'{url}?after={cursor}', 'trending_score_idx')
+        self.assertIndexedPlans(f'{url}?before={cursor}', 'trending_score_idx')
@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import engines
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from .. import recommendations
+from ..models import Follow, Recommendation, User
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        names = ('reader', 'a1', 'a2', 'c1', 'c2', 'c3', 'twin')
+        cls.users = {
+            name: User.objects.create_user(username=name) for name in names
+        }
+        for user, author in (
+            ('reader', 'a1'), ('reader', 'a2'),
+            ('a1', 'c1'), ('a1', 'c2'), ('a2', 'c1'),
+            # twin подписан на тех же авторов, что и reader, и ещё на c3.
+            ('twin', 'a1'), ('twin', 'a2'), ('twin', 'c3'),
+        ):
+            Follow.objects.create(
+                user=cls.users[user], author=cls.users[author]
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def candidates(self, name):
+        return list(
+            Recommendation.objects.filter(user=self.users[name])
+            .order_by('-score', 'candidate_id')
+            .values_list('candidate__username', 'mutual')
+        )
+
+    def test_two_hop_and_co_follow(self):
+        recommendations.build(chunk_size=2)
+        found = self.candidates('reader')
+        self.assertEqual(found[0], ('c1', 2))
+        self.assertEqual(set(found[1:]), {('c2', 1), ('c3', 0)})
+        usernames = {username for username, _ in found}
+        self.assertFalse(usernames & {'reader', 'a1', 'a2'})
+
+    def test_top_k_and_rebuild_replaces_rows(self):
+        recommendations.build(top_k=1)
+        self.assertEqual(self.candidates('reader'), [('c1', 2)])
+        Follow.objects.filter(user=self.users['reader']).delete()
+        recommendations.build(top_k=1)
+        self.assertEqual(self.candidates('reader'), [])
+
+    def test_command(self):
+        out = StringIO()
+        call_command('build_recommendations', stdout=out)
+        self.assertIn('Рекомендаций:', out.getvalue())
+        self.assertTrue(Recommendation.objects.exists())
+
+    def test_include_is_one_query_and_skips_followed(self):
+        recommendations.build()
+        reader = User.objects.get(username='reader')
+        Follow.objects.create(user=reader, author=self.users['c1'])
+        request = RequestFactory().get('/')
+        request.user = reader
+        template = engines['django'].from_string(
+            '{% load post_recommendations %}{% who_to_follow %}'
+        )
+        template.render({}, request)
+        with self.assertNumQueries(1):
+            html = template.render({}, request)
+        self.assertNotIn('@c1<', html)
+        self.assertIn('@c2<', html)
+        self.assertIn(reverse('profile_follow', args=['c3']), html)
+
+    def test_profile_and_follow_pages_show_suggestions(self):
+        recommendations.build()
+        self.client.force_login(self.users['reader'])
+        for url in (reverse('follow_index'), reverse('profile', args=['a1'])):
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), '@c1<')
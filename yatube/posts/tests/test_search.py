@@ -0,0 +1,65 @@
+from django.contrib.admin.sites import site
+from django.test import TestCase, Client, RequestFactory
+from django.urls.base import reverse
+
+from ..models import Post, User
+from ..search import match_expression
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(
+            text='Котики любят <b>рыбу</b>',
+            author=cls.user
+        )
+        cls.other = Post.objects.create(
+            text='Собаки любят кости',
+            author=cls.user
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, query):
+        return self.guest_client.get(reverse('search'), {'q': query})
+
+    def test_ranked_results_with_snippet(self):
+        response = self.search('котики')
+        page = response.context['page']
+        self.assertEqual(list(page), [self.post])
+        self.assertContains(
+            response, '<mark>Котики</mark> любят &lt;b&gt;рыбу&lt;/b&gt;'
+        )
+
+    def test_prefix_and_several_words(self):
+        self.assertEqual(len(self.search('люб').context['page']), 2)
+        self.assertEqual(
+            list(self.search('собаки любят').context['page']),
+            [self.other]
+        )
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.get(pk=self.other.pk)
+        post.text = 'Хомяки'
+        post.save()
+        self.assertEqual(len(self.search('собаки').context['page']), 0)
+        self.assertEqual(len(self.search('хомяки').context['page']), 1)
+        post.delete()
+        self.assertEqual(len(self.search('хомяки').context['page']), 0)
+
+    def test_query_syntax_is_not_passed_through(self):
+        self.assertEqual(match_expression('a" OR b*'), '"a" "OR" "b"*')
+        response = self.search('" NEAR( *')
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_search_uses_index(self):
+        admin = site._registry[Post]
+        request = RequestFactory().get('/')
+        queryset, distinct = admin.get_search_results(
+            request, Post.objects.all(), 'кости'
+        )
+        self.assertEqual(list(queryset), [self.other])
+        self.assertFalse(distinct)
@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls.base import reverse
+
+from ..models import Comment, Follow, Post, User, UserStats
+from ..stats import stats_for
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        post = Post.objects.create(text='Тестовый текст', author=self.author)
+        Comment.objects.create(text='Текст', author=self.user, post=post)
+        self.authorized_client.get(
+            reverse('profile_follow', kwargs={'username': 'author'})
+        )
+        author_stats = self.stats(self.author)
+        user_stats = self.stats(self.user)
+        self.assertEqual(author_stats.posts, 1)
+        self.assertEqual(author_stats.followers, 1)
+        self.assertEqual(user_stats.following, 1)
+        self.assertEqual(user_stats.comments, 1)
+
+        self.authorized_client.get(
+            reverse('profile_unfollow', kwargs={'username': 'author'})
+        )
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts, 0)
+        self.assertEqual(self.stats(self.author).followers, 0)
+        self.assertEqual(self.stats(self.user).following, 0)
+        self.assertEqual(self.stats(self.user).comments, 0)
+
+    def test_rebuild_command(self):
+        Post.objects.create(text='Тестовый текст', author=self.author)
+        Follow.objects.create(user=self.user, author=self.author)
+        UserStats.objects.all().delete()
+        call_command('rebuild_user_stats')
+        self.assertEqual(self.stats(self.author).posts, 1)
+        self.assertEqual(self.stats(self.author).followers, 1)
+        self.assertEqual(self.stats(self.user).following, 1)
+
+    def test_profile_reads_stats_row(self):
+        Post.objects.create(text='Тестовый текст', author=self.author)
+        UserStats.objects.filter(user=self.author).update(followers=42)
+        response = self.authorized_client.get(
+            reverse('profile', kwargs={'username': 'author'})
+        )
+        self.assertEqual(response.context['stats'].posts, 1)
+        self.assertContains(response, 'Подписчиков: 42')
+
+    def test_drifted_counter_stays_at_zero(self):
+        post = Post.objects.create(text='Тестовый текст', author=self.author)
+        # Счётчик разошёлся с таблицей, например после импорта.
+        UserStats.objects.filter(user=self.author).update(posts=0)
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts, 0)
+
+    def test_lazy_rebuild_keeps_existing_row(self):
+        Post.objects.create(text='Тестовый текст', author=self.author)
+        UserStats.objects.filter(user=self.author).delete()
+        self.assertEqual(stats_for(self.author).posts, 1)
+        # Строку уже создал параллельный запрос между get и созданием.
+        with mock.patch.object(
+            UserStats.objects, 'get', side_effect=UserStats.DoesNotExist
+        ):
+            self.assertEqual(stats_for(self.author).posts, 1)
+        self.assertEqual(UserStats.objects.filter(user=self.author).count(), 1)
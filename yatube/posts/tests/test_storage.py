@@ -0,0 +1,162 @@
+import hashlib
+import os
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+
+from .. import images, storage, thumbnails
+from ..models import Post, User
+from .utils import TempMediaMixin
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+DIGEST = hashlib.sha256(SMALL_GIF).hexdigest()
+
+
+def blob_files():
+    root = os.path.join(settings.MEDIA_ROOT, 'posts')
+    return sorted(
+        os.path.relpath(os.path.join(directory, name), settings.MEDIA_ROOT)
+        for directory, _, names in os.walk(root)
+        for name in names
+        if not directory.startswith(os.path.join(root, 'variants'))
+        # Блокировки и брони хранилища - не блобы.
+        and not name.startswith('.')
+        and os.path.basename(directory) != storage.RESERVED_DIR
+    )
+
+
+def commit_uploads():
+    # В TestCase колбэки on_commit не выполняются: брони загрузок
+    # снимаются вручную, как после коммита.
+    for name in list(storage._reservations):
+        while storage._reservations.get(name):
+            storage.unreserve(name)
+
+
+class ContentAddressedStorageTests(TempMediaMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    def create_post(self, name='meme.gif'):
+        return Post.objects.create(
+            text='Мем', author=self.user,
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif')
+        )
+
+    def test_same_content_is_stored_once(self):
+        first = self.create_post('meme.gif')
+        second = self.create_post('meme (1).GIF')
+        self.assertEqual(first.image.name, f'posts/{DIGEST[:2]}/{DIGEST}.gif')
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(blob_files(), [first.image.name])
+
+    def test_release_keeps_referenced_blob(self):
+        first = self.create_post()
+        second = self.create_post()
+        name = first.image.name
+        commit_uploads()
+        first.delete()
+        self.assertFalse(storage.release(name))
+        self.assertEqual(blob_files(), [name])
+        second.delete()
+        self.assertTrue(storage.release(name))
+        self.assertEqual(blob_files(), [])
+
+    def test_release_keeps_blob_given_to_pending_upload(self):
+        post = self.create_post()
+        name = post.image.name
+        commit_uploads()
+        post.delete()
+        # Загрузка того же содержимого получила имя, но пост ещё не
+        # закоммичен.
+        blobs = Post._meta.get_field('image').storage
+        self.assertEqual(
+            blobs.save('posts/copy.gif', ContentFile(SMALL_GIF)), name
+        )
+        self.assertFalse(storage.release(name))
+        self.assertEqual(blob_files(), [name])
+        storage.unreserve(name)
+        self.assertTrue(storage.release(name))
+        self.assertEqual(blob_files(), [])
+
+    def test_stale_reservation_is_ignored(self):
+        post = self.create_post()
+        name = post.image.name
+        post.delete()
+        with mock.patch.object(storage, 'RESERVATION_TIMEOUT', -60):
+            self.assertTrue(storage.release(name))
+        self.assertEqual(blob_files(), [])
+
+    def test_release_ignores_legacy_names(self):
+        os.makedirs(self.media_root, exist_ok=True)
+        with open(os.path.join(self.media_root, 'old.gif'), 'wb') as file:
+            file.write(SMALL_GIF)
+        self.assertFalse(storage.release('old.gif'))
+        self.assertTrue(os.path.exists(
+            os.path.join(self.media_root, 'old.gif')
+        ))
+
+    def test_identical_upload_reuses_variants(self):
+        first = self.create_post()
+        thumbnails.generate(first.image.name)
+        second = self.create_post()
+        with mock.patch.object(images, 'build_variants') as build:
+            thumbnails.generate(second.image.name)
+        build.assert_not_called()
+        second.refresh_from_db()
+        first.refresh_from_db()
+        self.assertEqual(second.image_variants, first.image_variants)
+
+    def test_dedupe_media_command(self):
+        blobs = Post._meta.get_field('image').storage
+        legacy = [
+            # Старое хранилище давало копиям суффиксы.
+            'posts/meme.gif', 'posts/meme_Xa1b2c3.gif', 'posts/other.gif',
+        ]
+        contents = [SMALL_GIF, SMALL_GIF, SMALL_GIF + b'\x00']
+        for name, content in zip(legacy, contents):
+            path = os.path.join(self.media_root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(content)
+            Post.objects.create(text=name, author=self.user, image=name)
+        out = StringIO()
+        call_command('dedupe_media', stdout=out)
+        self.assertIn('Перенесено: 3, различных файлов: 2', out.getvalue())
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 2)
+        self.assertTrue(all(storage.is_content_name(n) for n in names))
+        self.assertEqual(blob_files(), sorted(names))
+        self.assertTrue(all(blobs.exists(name) for name in names))
+
+
+class ReleaseOnCommitTests(TempMediaMixin, TransactionTestCase):
+    def test_blob_is_deleted_with_last_post(self):
+        user = User.objects.create_user(username='test_user')
+        posts = [
+            Post.objects.create(
+                text='Мем', author=user,
+                image=ContentFile(SMALL_GIF, name='meme.gif')
+            )
+            for _ in range(2)
+        ]
+        name = posts[0].image.name
+        posts[0].delete()
+        self.assertEqual(blob_files(), [name])
+        posts[1].image = None
+        posts[1].save()
+        self.assertEqual(blob_files(), [])
@@ -0,0 +1,159 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import (
+    Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+)
+from django.urls.base import reverse
+
+from .. import cache as posts_cache, thumbnails
+from ..models import Post, User
+from .utils import TempMediaMixin
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def build_in_worker(name, force=False):
+    # Подменяет generate в процессе пула: метка с pid вместо вариантов.
+    if name.endswith('.broken'):
+        raise ValueError(name)
+    with open(name, 'w') as marker:
+        marker.write(str(os.getpid()))
+    return ['pool-test']
+
+
+class ThumbnailTests(TempMediaMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    def setUp(self):
+        super().setUp()
+        self.guest_client = Client()
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Тестовый текст',
+            author=self.user,
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=SMALL_GIF,
+                content_type='image/gif'
+            )
+        )
+
+    def variants(self):
+        self.post.refresh_from_db()
+        return json.loads(self.post.image_variants or '[]')
+
+    def test_page_falls_back_to_original(self):
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, self.post.image.url)
+        self.assertEqual(self.variants(), [])
+
+    def test_scheduled_variants_are_used(self):
+        self.guest_client.get(reverse('index'))
+        thumbnails.schedule([self.post.image.name])
+        variants = self.variants()
+        # Исходник 2x1 растягивается до кадра 960x339, шире - нет.
+        self.assertEqual(
+            [(v['format'], v['width'], v['height']) for v in variants],
+            [
+                (image_format, width, round(width * 339 / 960))
+                for width in (320, 480, 640, 960)
+                for image_format in ('WEBP', 'JPEG')
+            ]
+        )
+        for variant in variants:
+            self.assertTrue(default_storage.exists(variant['name']))
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, '<source type="image/webp" srcset="')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, 'width="960" height="339"')
+        for variant in variants:
+            self.assertContains(
+                response, f"{default_storage.url(variant['name'])} "
+                f"{variant['width']}w"
+            )
+
+    def test_render_does_not_touch_storage(self):
+        thumbnails.schedule([self.post.image.name])
+        cache.clear()
+        with mock.patch.object(
+            default_storage, 'exists', side_effect=AssertionError
+        ), mock.patch.object(
+            default_storage, 'open', side_effect=AssertionError
+        ):
+            response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, '<picture>')
+
+    def test_backfill_command(self):
+        tag = f'author:{self.user.pk}'
+        version = posts_cache.version(tag)
+        call_command('pregenerate_thumbnails', workers=0, stdout=StringIO())
+        self.assertTrue(self.variants())
+        self.assertNotEqual(posts_cache.version(tag), version)
+
+
+class InlineThumbnailTests(TempMediaMixin, TransactionTestCase):
+    def test_upload_has_variants_before_response(self):
+        user = User.objects.create_user(username='test_user')
+        client = Client()
+        client.force_login(user)
+        client.post(reverse('new_post'), {
+            'text': 'Тестовый текст',
+            'image': SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        })
+        post = Post.objects.get()
+        # Без пула варианты строятся в on_commit, до ответа.
+        self.assertTrue(json.loads(post.image_variants))
+        for variant in json.loads(post.image_variants):
+            self.assertTrue(default_storage.exists(variant['name']))
+
+
+@override_settings(THUMBNAIL_WORKERS=1)
+class ThumbnailPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+    def tearDown(self):
+        # Пул не должен писать в каталог, который уже удаляется.
+        thumbnails.wait()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_work_goes_through_pool_and_bumps_tags(self):
+        version = posts_cache.version('pool-test')
+        names = [
+            os.path.join(self.directory, f'{number}.done')
+            for number in range(3)
+        ]
+        with mock.patch.object(thumbnails, 'generate', build_in_worker):
+            thumbnails.schedule(names)
+            thumbnails.wait()
+        for name in names:
+            with open(name) as marker:
+                self.assertNotEqual(int(marker.read()), os.getpid())
+        self.assertNotEqual(posts_cache.version('pool-test'), version)
+
+    def test_worker_error_is_logged(self):
+        name = os.path.join(self.directory, 'image.broken')
+        with mock.patch.object(thumbnails, 'generate', build_in_worker):
+            with self.assertLogs('posts.thumbnails', 'ERROR'):
+                thumbnails.schedule([name])
+                thumbnails.wait()
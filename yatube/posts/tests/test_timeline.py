@@ -0,0 +1,124 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls.base import reverse
+
+from ..models import Follow, Post, Timeline, User
+from .. import timeline
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(
+            text='Старый пост',
+            author=cls.author
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def follow(self):
+        self.reader_client.get(
+            reverse('profile_follow', kwargs={'username': 'author'})
+        )
+
+    def test_follow_backfills_timeline(self):
+        self.follow()
+        self.assertTrue(
+            Timeline.objects.filter(
+                user=self.reader, post=self.old_post
+            ).exists()
+        )
+
+    def test_new_post_fans_out(self):
+        self.follow()
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        entry = Timeline.objects.get(user=self.reader, post=post)
+        self.assertEqual(entry.pub_date, post.pub_date)
+        response = self.reader_client.get(reverse('follow_index'))
+        self.assertEqual(
+            list(response.context['page']),
+            [post, self.old_post]
+        )
+
+    def test_unfollow_prunes_timeline(self):
+        self.follow()
+        self.reader_client.get(
+            reverse('profile_unfollow', kwargs={'username': 'author'})
+        )
+        self.assertFalse(Timeline.objects.filter(user=self.reader).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_heavy_author_merged_on_read(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Timeline.objects.all().delete()
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+        response = self.reader_client.get(reverse('follow_index'))
+        self.assertEqual(
+            list(response.context['page']),
+            [post, self.old_post]
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_dropping_to_limit_is_fanned_out(self):
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(text='Сверх предела', author=self.author)
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+        # Отписка только отмечает автора, ничего не раскладывая.
+        with CaptureQueriesContext(connection) as queries:
+            Follow.objects.filter(user=self.reader).delete()
+        self.assertFalse(any(
+            query['sql'].startswith('INSERT') for query in queries
+        ))
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+        self.assertIn(post, timeline.timeline_posts(other))
+        newer = Post.objects.create(text='До пересчёта', author=self.author)
+        self.assertIn(newer, timeline.timeline_posts(other))
+
+        out = StringIO()
+        call_command('settle_timelines', stdout=out)
+        self.assertIn('Авторов разложено: 1', out.getvalue())
+        self.assertEqual(
+            set(Timeline.objects.filter(user=other).values_list(
+                'post_id', flat=True
+            )),
+            {self.old_post.pk, post.pk, newer.pk}
+        )
+        self.assertEqual(list(timeline.heavy_authors([self.author.pk])), [])
+        self.assertIn(post, timeline.timeline_posts(other))
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_rebuild_matches_fan_out(self):
+        fans = [
+            User.objects.create_user(username=f'fan{number}')
+            for number in range(2)
+        ]
+        for fan in fans:
+            Follow.objects.create(user=fan, author=self.reader)
+        Follow.objects.create(user=fans[0], author=self.author)
+        # reader - тяжёлый автор (2 подписчика), author - нет.
+        for author in (self.reader, self.author):
+            Post.objects.create(text='Пост', author=author)
+
+        def rows():
+            return set(Timeline.objects.values_list(
+                'user_id', 'post_id', 'pub_date'
+            ))
+
+        fanned_out = rows()
+        self.assertFalse(
+            Timeline.objects.filter(post__author=self.reader).exists()
+        )
+        timeline.rebuild()
+        self.assertEqual(rows(), fanned_out)
@@ -0,0 +1,162 @@
+import math
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import trending
+from ..models import Comment, Follow, Post, TrendingPost, User
+
+
+def at(moment):
+    """Подменяет время auto_now_add для создаваемых объектов."""
+    return mock.patch('django.utils.timezone.now', return_value=moment)
+
+
+class TrendingScoreTests(TestCase):
+    def test_score_halves_every_half_life(self):
+        now = timezone.now()
+        older = trending.event_score(now - trending.HALF_LIFE)
+        self.assertAlmostEqual(
+            math.exp(older - trending.event_score(now)), 0.5
+        )
+
+    def test_log_sum_exp_is_stable(self):
+        big = 1e5
+        self.assertAlmostEqual(
+            trending.log_sum_exp([big, big]), big + math.log(2)
+        )
+
+
+class TrendingUpdateTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.now = timezone.now()
+        cls.author = User.objects.create_user(username='author')
+        cls.popular = User.objects.create_user(username='popular')
+        cls.reader = User.objects.create_user(username='reader')
+        for number in range(3):
+            Follow.objects.create(
+                user=User.objects.create_user(username=f'fan{number}'),
+                author=cls.popular,
+            )
+        with at(cls.now - timedelta(hours=2)):
+            cls.quiet = Post.objects.create(text='Тихий', author=cls.author)
+            cls.discussed = Post.objects.create(
+                text='Обсуждаемый', author=cls.author
+            )
+            cls.reached = Post.objects.create(
+                text='С охватом', author=cls.popular
+            )
+        with at(cls.now - trending.HORIZON - timedelta(days=1)):
+            cls.stale = Post.objects.create(text='Старый', author=cls.author)
+        with at(cls.now - timedelta(hours=1)):
+            for number in range(3):
+                Comment.objects.create(
+                    post=cls.discussed, author=cls.reader, text=f'{number}'
+                )
+
+    def setUp(self):
+        cache.clear()
+
+    def ranking(self):
+        return list(
+            TrendingPost.objects.order_by('-score', '-post_id')
+            .values_list('post_id', flat=True)
+        )
+
+    def test_comments_and_reach_rank_posts(self):
+        scored, pruned = trending.update(now=self.now)
+        self.assertEqual((scored, pruned), (3, 0))
+        self.assertEqual(
+            self.ranking(),
+            [self.discussed.pk, self.reached.pk, self.quiet.pk]
+        )
+        row = TrendingPost.objects.get(post=self.discussed)
+        self.assertEqual(row.comments, 3)
+        self.assertEqual(row.last_activity, Comment.objects.first().created)
+
+    def test_only_changed_posts_are_rescored(self):
+        trending.update(now=self.now)
+        later = self.now + timedelta(hours=1)
+        with at(later):
+            Comment.objects.create(
+                post=self.quiet, author=self.reader, text='Новый'
+            )
+        self.assertEqual(
+            trending.changed_posts(trending.watermark(later)),
+            sorted([self.quiet.pk, self.discussed.pk])
+        )
+        scored, _ = trending.update(now=later)
+        # Обсуждаемый пост попадает в перекрытие OVERLAP у метки, а пост
+        # популярного автора без новых событий не трогается.
+        self.assertEqual(scored, 2)
+        self.assertEqual(
+            TrendingPost.objects.get(post=self.quiet).last_activity, later
+        )
+
+    def test_stale_posts_are_pruned(self):
+        trending.update(now=self.now)
+        scored, pruned = trending.update(
+            now=self.now + trending.HORIZON + timedelta(hours=2)
+        )
+        self.assertEqual(scored, 0)
+        self.assertEqual(pruned, 3)
+        self.assertFalse(TrendingPost.objects.exists())
+
+    def test_command(self):
+        out = StringIO()
+        call_command('update_trending', stdout=out)
+        self.assertIn('Пересчитано постов: 3', out.getvalue())
+
+
+class TrendingViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        now = timezone.now()
+        for number in range(15):
+            Post.objects.create(text=f'Пост {number}', author=cls.author)
+        TrendingPost.objects.bulk_create(
+            TrendingPost(post=post, score=-post.pk % 4, last_activity=now)
+            for post in Post.objects.all()
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def expected(self):
+        return list(
+            TrendingPost.objects.order_by('-score', '-post_id')
+            .values_list('post_id', flat=True)
+        )
+
+    def test_cursor_pages_follow_the_ranking(self):
+        url = reverse('trending')
+        response = self.client.get(url)
+        page = response.context['page']
+        seen = [post.pk for post in page]
+        self.assertEqual(len(seen), 10)
+        self.assertContains(response, '?after=')
+        response = self.client.get(f'{url}?after={page.next_cursor}')
+        seen += [post.pk for post in response.context['page']]
+        self.assertEqual(seen, self.expected())
+        back = response.context['page'].previous_cursor
+        response = self.client.get(f'{url}?before={back}')
+        self.assertEqual(
+            [post.pk for post in response.context['page']],
+            self.expected()[:10]
+        )
+
+    def test_only_ranked_posts_are_listed(self):
+        TrendingPost.objects.filter(post_id__in=self.expected()[1:]).delete()
+        response = self.client.get(reverse('trending'))
+        self.assertEqual(len(response.context['page']), 1)
@@ -4,12 +4,15 @@ import tempfile
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
 from django.conf import settings
+from django.db import connection
 from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls.base import reverse
 from django import forms
 from django.conf import settings
 
 from ..models import Comment, Post, Group, Follow, User
+from ..paginator import COMMENTS_PER_PAGE
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -115,16 +118,41 @@ class PostViewsTests(TestCase):
 
     def test_cache_exists(self):
         response1 = self.authorized_client.get(reverse('index'))
-        post = Post.objects.create(
-            text='Тестовый текст',
-            author=self.user
-        )
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
         response2 = self.authorized_client.get(reverse('index'))
         self.assertEqual(response1.content, response2.content)
         cache.clear()
         response3 = self.authorized_client.get(reverse('index'))
         self.assertNotEqual(response2.content, response3.content)
-        self.assertIn(post, response3.context['page'])
+
+    def test_cache_invalidated_by_writes(self):
+        response1 = self.authorized_client.get(reverse('index'))
+        post = Post.objects.create(
+            text='Новый пост в кэше',
+            author=self.user
+        )
+        response2 = self.authorized_client.get(reverse('index'))
+        self.assertNotEqual(response1.content, response2.content)
+        self.assertContains(response2, post.text)
+        Comment.objects.create(text='Текст', author=self.user, post=post)
+        response3 = self.authorized_client.get(reverse('index'))
+        self.assertContains(response3, 'Комментариев: 1')
+
+    def test_cached_fragment_shared_without_owner_links(self):
+        other = User.objects.create_user(username='other_user')
+        other_client = Client()
+        other_client.force_login(other)
+        edit_url = reverse(
+            'post_edit',
+            kwargs={'username': self.user.username, 'post_id': self.post.id}
+        )
+        self.assertContains(
+            self.authorized_client.get(reverse('index')), edit_url
+        )
+        self.assertNotContains(other_client.get(reverse('index')), edit_url)
+        self.assertNotContains(
+            self.guest_client.get(reverse('index')), edit_url
+        )
 
     def test_templates_use_correct(self):
         for template, name in self.templates.items():
@@ -344,3 +372,136 @@ class CreateViewsTests(TestCase):
             reverse('group_posts', kwargs={'slug': f'{self.group.slug}'})
         )
         self.assertIn(self.post, response.context['page'])
+
+
+class ListingQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user_q')
+        cls.group = Group.objects.create(
+            title='Тестовый title',
+            slug='test',
+            description='описание'
+        )
+        cls.url_names = [
+            reverse('index'),
+            reverse('group_posts', kwargs={'slug': cls.group.slug}),
+            reverse('profile', kwargs={'username': cls.user.username}),
+        ]
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def add_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                text='Тестовый текст',
+                author=self.user,
+                group=self.group
+            )
+            Comment.objects.create(
+                text='Комментарий', author=self.user, post=post
+            )
+
+    def count_queries(self, adress):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(adress)
+        return len(queries)
+
+    def test_queries_do_not_depend_on_page_size(self):
+        self.add_posts(1)
+        small = {adress: self.count_queries(adress)
+                 for adress in self.url_names}
+        self.add_posts(9)
+        for adress in self.url_names:
+            with self.subTest(adress=adress):
+                self.assertEqual(self.count_queries(adress), small[adress])
+
+    def test_card_shows_comment_count(self):
+        self.add_posts(1)
+        response = self.authorized_client.get(reverse('index'))
+        self.assertEqual(response.context['page'][0].comment_count, 1)
+        self.assertContains(response, 'Комментариев: 1')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class CommentsPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user_c')
+        cls.post = Post.objects.create(text='Тестовый текст', author=cls.user)
+        for i in range(COMMENTS_PER_PAGE * 2 + 5):
+            commentator = User.objects.create_user(username=f'reader_{i}')
+            Comment.objects.create(
+                text=f'Комментарий {i}', author=commentator, post=cls.post
+            )
+        cls.expected = list(
+            Comment.objects.filter(post=cls.post).order_by('-created', '-id')
+        )
+        cls.post_url = reverse(
+            'post_view',
+            kwargs={'username': cls.user.username, 'post_id': cls.post.pk}
+        )
+        cls.more_url = reverse(
+            'post_comments',
+            kwargs={'username': cls.user.username, 'post_id': cls.post.pk}
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_post_shows_first_comments(self):
+        response = self.guest_client.get(self.post_url)
+        comments = response.context['comments']
+        self.assertEqual(list(comments), self.expected[:COMMENTS_PER_PAGE])
+        self.assertContains(
+            response, f'{self.more_url}?after={comments.next_cursor}'
+        )
+
+    def test_post_queries_do_not_depend_on_comments(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(self.post_url)
+        self.assertLess(len(queries), 10)
+
+    def test_html_chunks(self):
+        response = self.guest_client.get(self.post_url)
+        cursor = response.context['comments'].next_cursor
+        loaded = []
+        while cursor:
+            response = self.guest_client.get(f'{self.more_url}?after={cursor}')
+            self.assertTemplateUsed(response, 'includes/comments.html')
+            loaded += list(response.context['comments'])
+            cursor = response.context['comments'].next_cursor
+        self.assertEqual(loaded, self.expected[COMMENTS_PER_PAGE:])
+        self.assertNotContains(response, 'js-more-comments')
+
+    def test_json_chunk(self):
+        response = self.guest_client.get(self.more_url, {'format': 'json'})
+        data = response.json()
+        self.assertEqual(
+            [item['id'] for item in data['comments']],
+            [comment.id for comment in self.expected[:COMMENTS_PER_PAGE]]
+        )
+        self.assertEqual(
+            data['comments'][0]['author'], self.expected[0].author.username
+        )
+        response = self.guest_client.get(
+            self.more_url, {'format': 'json', 'after': data['next']}
+        )
+        self.assertEqual(
+            response.json()['comments'][0]['id'],
+            self.expected[COMMENTS_PER_PAGE].id
+        )
+
+    def test_unknown_post(self):
+        response = self.guest_client.get(reverse(
+            'post_comments',
+            kwargs={'username': 'reader_0', 'post_id': self.post.pk}
+        ))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,28 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+
+from .. import thumbnails
+
+
+class TempMediaMixin:
+    """Свой пустой MEDIA_ROOT на каждый тест.
+
+    Миниатюры строятся сразу, в процессе теста. Каталог удаляется только
+    после ``thumbnails.wait()``, чтобы пул, если тест его включил, не
+    дописывал варианты в удаляемый каталог.
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        media = override_settings(
+            MEDIA_ROOT=self.media_root, THUMBNAIL_WORKERS=0
+        )
+        media.enable()
+        # Очистка идёт в обратном порядке: настройки, пул, каталог.
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.addCleanup(thumbnails.wait)
+        self.addCleanup(media.disable)
+        super().setUp()
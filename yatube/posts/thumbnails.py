@@ -0,0 +1,102 @@
+import json
+import logging
+import multiprocessing
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+from . import cache, images, pagecache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def generate(name, force=False):
+    """Строит варианты кадра карточки для файла; выполняется в пуле.
+
+    Описания вариантов записываются во все посты с этой картинкой,
+    чтобы шаблонам не приходилось обращаться к хранилищу. Картинки
+    хранятся по хэшу содержимого, так что повторная загрузка той же
+    картинки получает уже готовые варианты без ``force``. Возвращает
+    теги кэша страниц с этими постами: сбросить их должен процесс
+    сервера, у воркеров пула свой локальный кэш.
+    """
+    posts = Post.objects.filter(image=name)
+    found = list(posts.values_list('pk', 'author_id', 'group_id'))
+    if not found:
+        return []
+    built = None
+    if not force:
+        built = posts.exclude(image_variants='').values_list(
+            'image_variants', flat=True
+        ).order_by('pk').first()
+    if built is None:
+        built = json.dumps(images.build_variants(
+            name, Post._meta.get_field('image').storage
+        ))
+    posts.update(image_variants=built)
+    tags = ['feed']
+    for post in found:
+        tags.extend(pagecache.post_tags(*post))
+    return tags
+
+
+def init_worker():
+    # Соединения с базой, унаследованные от родителя через fork,
+    # использовать нельзя: воркер открывает свои.
+    connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=init_worker,
+        )
+    return _executor
+
+
+def _finished(future):
+    error = future.exception()
+    if error is not None:
+        logger.error('Миниатюры не построены: %s', error)
+    else:
+        cache.bump(*future.result())
+
+
+def wait():
+    """Дожидается поставленных в пул миниатюр и останавливает пул.
+
+    Колбэки ``_finished`` к возврату уже выполнены; следующий
+    ``schedule`` создаст пул заново.
+    """
+    global _executor
+    executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def schedule(names):
+    """Ставит построение миниатюр в пул процессов.
+
+    При ``THUMBNAIL_WORKERS = 0`` миниатюры строятся сразу, в текущем
+    процессе.
+    """
+    global _executor
+    names = [name for name in names if name]
+    if not settings.THUMBNAIL_WORKERS:
+        for name in names:
+            cache.bump(*generate(name))
+        return
+    executor = _get_executor()
+    try:
+        for name in names:
+            executor.submit(generate, name).add_done_callback(_finished)
+    except BrokenExecutor:
+        logger.exception('Пул миниатюр упал, будет создан заново')
+        _executor = None
@@ -0,0 +1,166 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from .models import Follow, Post, Timeline, UserStats
+
+BATCH_SIZE = 500
+
+
+def heavy_authors(author_ids):
+    """Авторы, чьи посты не раскладываются по лентам при записи.
+
+    Сюда же входят авторы, ждущие ``settle_pending``: их прошлые посты
+    в лентах есть не все.
+    """
+    return set(
+        UserStats.objects.filter(
+            Q(followers__gt=settings.TIMELINE_FANOUT_LIMIT)
+            | Q(timeline_pending=True),
+            user_id__in=author_ids,
+        ).values_list('user_id', flat=True)
+    )
+
+
+def fan_out(posts):
+    """Добавляет посты в ленты подписчиков их авторов."""
+    by_author = {}
+    for post in posts:
+        by_author.setdefault(post.author_id, []).append(post)
+    heavy = heavy_authors(by_author)
+    for author_id, author_posts in by_author.items():
+        if author_id in heavy:
+            continue
+        followers = Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True)
+        Timeline.objects.bulk_create(
+            (
+                Timeline(user_id=user_id, post=post, pub_date=post.pub_date)
+                for user_id in followers.iterator()
+                for post in author_posts
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True
+        )
+
+
+def backfill(user_id, author_id):
+    """Заполняет ленту подписчика постами нового автора."""
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )
+    Timeline.objects.bulk_create(
+        (
+            Timeline(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def fan_out_author(author_id):
+    """Раскладывает все посты автора по лентам всех его подписчиков."""
+    posts = list(
+        Post.objects.filter(author_id=author_id).values_list('pk', 'pub_date')
+    )
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    Timeline.objects.bulk_create(
+        (
+            Timeline(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for user_id in followers.iterator()
+            for post_id, pub_date in posts
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def settle_author(author_id):
+    """Отмечает автора, переставшего быть тяжёлым, для ``settle_pending``.
+
+    Посты, опубликованные сверх ``TIMELINE_FANOUT_LIMIT`` подписчиков,
+    в ленты не попадали и читались вживую. Разложить их - до подписчиков
+    на все посты - слишком долго для запроса отписки, поэтому автор
+    остаётся в ``heavy_authors``, пока это не сделает пакетная команда.
+    """
+    UserStats.objects.filter(
+        user_id=author_id, followers=settings.TIMELINE_FANOUT_LIMIT
+    ).update(timeline_pending=True)
+
+
+def settle_pending():
+    """Раскладывает посты отмеченных авторов; возвращает их число."""
+    authors = UserStats.objects.filter(
+        timeline_pending=True
+    ).values_list('user_id', flat=True)
+    settled = 0
+    for author_id in list(authors):
+        fan_out_author(author_id)
+        # Снова тяжёлый - отметка не нужна: его посты и так читаются
+        # вживую, а при новой отписке автор будет отмечен заново.
+        UserStats.objects.filter(user_id=author_id).update(
+            timeline_pending=False
+        )
+        settled += 1
+    return settled
+
+
+def rebuild():
+    """Пересобирает все ленты одним INSERT ... SELECT.
+
+    Нужно после массовой загрузки, которая обходит сигналы. Как и
+    ``fan_out``, пропускает авторов из ``heavy_authors`` - их посты
+    домешивает ``timeline_posts``; поэтому счётчики ``UserStats`` к этому
+    моменту должны быть собраны.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        Timeline.objects.all().delete()
+        cursor.execute(
+            f'INSERT INTO {Timeline._meta.db_table} '
+            f'(user_id, post_id, pub_date) '
+            f'SELECT follow.user_id, post.id, post.pub_date '
+            f'FROM {Follow._meta.db_table} follow '
+            f'JOIN {Post._meta.db_table} post '
+            f'ON post.author_id = follow.author_id '
+            f'LEFT JOIN {UserStats._meta.db_table} stats '
+            f'ON stats.user_id = follow.author_id '
+            f'WHERE stats.followers IS NULL OR stats.followers <= %s',
+            [settings.TIMELINE_FANOUT_LIMIT]
+        )
+        # Посты всех нетяжёлых авторов уже в лентах.
+        UserStats.objects.filter(timeline_pending=True).update(
+            timeline_pending=False
+        )
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты подписчика посты автора, от которого он отписался."""
+    Timeline.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def timeline_posts(user):
+    """Посты избранных авторов пользователя, от новых к старым.
+
+    Обычно это один диапазон индекса ленты; посты авторов с огромным
+    числом подписчиков домешиваются при чтении.
+    """
+    heavy = heavy_authors(
+        Follow.objects.filter(user=user).values('author_id')
+    )
+    if not heavy:
+        # Сортировка по полям самой ленты идёт по её индексу, без
+        # временного B-дерева; feed_id делает порядок однозначным.
+        return Post.objects.filter(timeline__user=user).annotate(
+            feed_date=F('timeline__pub_date'),
+            feed_id=F('timeline__post_id'),
+        ).order_by('-feed_date', '-feed_id')
+    return Post.objects.filter(
+        Q(pk__in=Timeline.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=heavy)
+    )
@@ -0,0 +1,140 @@
+"""Рейтинг "в тренде": посты с затухающей со временем активностью.
+
+Каждое событие поста - публикация и комментарии - весит ``w`` и к
+моменту ``now`` затухает вдвое за ``HALF_LIFE``::
+
+    w · exp(-(now - t) / TAU),  TAU = HALF_LIFE / ln 2
+
+Множитель ``exp(-now / TAU)`` общий для всех постов и на порядок не
+влияет, поэтому в таблице хранится логарифм незатухающей суммы
+относительно постоянной эпохи::
+
+    score = log Σ w · exp((t - EPOCH) / TAU)
+
+Оценка поста без новых событий от времени не меняется, так что
+пересчитывать нужно только посты с публикацией или комментарием после
+прошлого прогона. Сами экспоненты через годы после эпохи не влезли бы
+во float, поэтому сумма считается в логарифмах (log-sum-exp).
+
+Вес публикации растёт с охватом - логарифмом числа подписчиков автора;
+комментарий весит ``COMMENT_WEIGHT``. Удалённый комментарий учтётся при
+следующем событии поста, а посты без активности дольше ``HORIZON``
+выпадают из таблицы.
+"""
+import math
+from datetime import datetime, timedelta, timezone
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone as django_timezone
+
+from . import cache
+from .models import Comment, Post, TrendingPost
+
+EPOCH = datetime(2021, 1, 1, tzinfo=timezone.utc)
+HALF_LIFE = timedelta(hours=6)
+TAU = HALF_LIFE.total_seconds() / math.log(2)
+# За неделю вес события падает в 2^28 раз - дальше его можно не считать.
+HORIZON = timedelta(days=7)
+# Комментарий, сохранённый раньше метки, но закоммиченный позже прогона.
+OVERLAP = timedelta(minutes=5)
+COMMENT_WEIGHT = 1.0
+REACH_WEIGHT = 1.0
+# Не больше 999 параметров SQLite в post_id__in.
+CHUNK_SIZE = 500
+
+
+def event_score(moment, weight=1.0):
+    """Логарифм вклада одного события в ``score``."""
+    return (moment - EPOCH).total_seconds() / TAU + math.log(weight)
+
+
+def log_sum_exp(values):
+    top = max(values)
+    return top + math.log(sum(math.exp(value - top) for value in values))
+
+
+def publication_weight(followers):
+    return 1.0 + REACH_WEIGHT * math.log1p(followers or 0)
+
+
+def watermark(now):
+    """С какого момента искать изменившиеся посты.
+
+    Метка - последнее уже учтённое событие; при пустой таблице или
+    давнем прогоне достаточно окна ``HORIZON``.
+    """
+    latest = TrendingPost.objects.aggregate(
+        latest=Max('last_activity')
+    )['latest']
+    since = now - HORIZON
+    if latest is not None:
+        since = max(since, latest - OVERLAP)
+    return since
+
+
+def changed_posts(since):
+    """id постов, опубликованных или прокомментированных после ``since``."""
+    posts = set(
+        Post.objects.filter(pub_date__gte=since)
+        .order_by().values_list('pk', flat=True)
+    )
+    posts.update(
+        Comment.objects.filter(created__gte=since)
+        .order_by().values_list('post_id', flat=True).distinct()
+    )
+    return sorted(posts)
+
+
+def score_posts(post_ids, now):
+    """Строки ``TrendingPost`` для постов с активностью в окне."""
+    start = now - HORIZON
+    events = {}
+    for post_id, pub_date, followers in Post.objects.filter(
+        pk__in=post_ids
+    ).order_by().values_list('pk', 'pub_date', 'author__stats__followers'):
+        events[post_id] = (
+            [event_score(pub_date, publication_weight(followers))],
+            pub_date,
+            0,
+        )
+    for post_id, created in Comment.objects.filter(
+        post_id__in=post_ids, created__gte=start
+    ).order_by().values_list('post_id', 'created'):
+        scores, latest, comments = events[post_id]
+        scores.append(event_score(created, COMMENT_WEIGHT))
+        events[post_id] = (scores, max(latest, created), comments + 1)
+    return [
+        TrendingPost(
+            post_id=post_id,
+            score=log_sum_exp(scores),
+            comments=comments,
+            last_activity=latest,
+        )
+        for post_id, (scores, latest, comments) in events.items()
+        if latest >= start
+    ]
+
+
+def update(now=None, chunk_size=CHUNK_SIZE):
+    """Пересчитывает оценки изменившихся постов.
+
+    Возвращает ``(scored, pruned)`` - сколько строк записано и сколько
+    устаревших удалено.
+    """
+    now = now or django_timezone.now()
+    post_ids = changed_posts(watermark(now))
+    scored = 0
+    for start in range(0, len(post_ids), chunk_size):
+        chunk = post_ids[start:start + chunk_size]
+        rows = score_posts(chunk, now)
+        with transaction.atomic():
+            TrendingPost.objects.filter(post_id__in=chunk).delete()
+            TrendingPost.objects.bulk_create(rows)
+        scored += len(rows)
+    pruned, _ = TrendingPost.objects.filter(
+        last_activity__lt=now - HORIZON
+    ).delete()
+    if scored or pruned:
+        cache.bump('trending')
+    return scored, pruned
@@ -1,57 +1,171 @@
+from django.conf import settings
 from django.shortcuts import get_object_or_404, render, redirect
-from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import F
+from django.http import JsonResponse
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
 
+from . import cache, conditional, follows, pagecache, thumbnails
 from .models import Comment, Follow, Group, Post, User
 from .forms import PostForm, CommentForm
+from .paginator import (
+    COMMENTS_PER_PAGE, POSTS_PER_PAGE, CursorPaginator, WindowPaginator,
+    paginate
+)
+from .search import search_posts
+from .stats import stats_for
+from .timeline import timeline_posts
 
 
+def schedule_thumbnails(post):
+    if post.image:
+        name = post.image.name
+        transaction.on_commit(lambda: thumbnails.schedule([name]))
+
+
+def comments_page(request, post_id):
+    """Порция комментариев к посту после курсора ``?after=``."""
+    comments = Comment.objects.filter(
+        post_id=post_id
+    ).select_related('author')
+    paginator = CursorPaginator(
+        comments, COMMENTS_PER_PAGE, ordering=('-created', '-id')
+    )
+    return paginator.get_page(after=request.GET.get('after'))
+
+
+@condition(etag_func=conditional.index_etag)
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'index.html', {'page': page, })
+    post_list = Post.objects.for_listing()
+    page = paginate(request, post_list, count_tags=['feed'])
+    response = render(request, 'index.html', {
+        'page': page,
+        'feed_version': cache.version('feed'),
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    })
+    return pagecache.tag(response, 'feed')
+
 
+@condition(etag_func=conditional.trending_etag)
+def trending(request):
+    """Посты по убыванию оценки из ``TrendingPost``.
 
+    Порядок задаёт индекс рейтинга, поэтому страницы листаются курсором
+    по (оценка, id) независимо от ``POSTS_PAGINATION``; id берётся из
+    той же таблицы, иначе SQLite досортировывает выборку.
+    """
+    post_list = Post.objects.for_listing().filter(
+        trending__isnull=False
+    ).annotate(
+        trending_score=F('trending__score'),
+        trending_post=F('trending__post'),
+    )
+    paginator = CursorPaginator(
+        post_list, POSTS_PER_PAGE,
+        ordering=('-trending_score', '-trending_post')
+    )
+    page = paginator.get_page(
+        after=request.GET.get('after'), before=request.GET.get('before')
+    )
+    response = render(request, 'trending.html', {'page': page})
+    return pagecache.tag(response, 'feed', 'trending')
+
+
+@condition(etag_func=conditional.group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'group.html', {'group': group, 'page': page, })
+    post_list = group.posts.for_listing()
+    page = paginate(request, post_list, count_tags=[f'group:{group.pk}'])
+    response = render(
+        request, 'group.html', {'group': group, 'page': page, }
+    )
+    return pagecache.tag(response, f'group:{group.pk}')
 
 
+@condition(etag_func=conditional.profile_etag)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
     user = request.user
-    post_list = author.posts.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    following = user.is_authenticated and Follow.objects.filter(
-        user=user, author=author
-    ).exists()
-    return render(
+    stats = stats_for(author)
+    post_list = author.posts.for_listing()
+    page = paginate(request, post_list, count=stats.posts)
+    following = author.pk in follows.followed_authors(user)
+    response = render(
         request,
         'profile.html',
-        {'author': author, 'page': page, 'following': following, }
+        {
+            'author': author,
+            'stats': stats,
+            'page': page,
+            'following': following,
+        }
     )
+    return pagecache.tag(response, f'author:{author.pk}')
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page = None
+    if query:
+        paginator = WindowPaginator(search_posts(query), POSTS_PER_PAGE)
+        page = paginator.get_page(request.GET.get('page'))
+    return render(request, 'search.html', {
+        'query': query,
+        'page': page,
+        'page_params': urlencode({'q': query}) + '&',
+    })
 
 
+@condition(etag_func=conditional.post_etag)
 def post_view(request, username, post_id):
     post = get_object_or_404(
-        Post.objects.select_related('author'),
+        Post.objects.for_listing(),
         id=post_id, author__username=username
     )
     form = CommentForm(instance=None)
-    comments = Comment.objects.filter(post_id=post_id)
-    return render(request, 'post.html', {
+    response = render(request, 'post.html', {
         'form': form,
         'post': post,
-        'comments': comments,
+        'stats': stats_for(post.author),
+        'comments': comments_page(request, post_id),
     })
+    return pagecache.tag(response, *pagecache.post_tags(
+        post.pk, post.author_id, post.group_id
+    ))
+
+
+def post_comments(request, username, post_id):
+    """Следующие комментарии для кнопки "Показать ещё".
+
+    По умолчанию - HTML-фрагмент с карточками и новой кнопкой,
+    с ``?format=json`` - данные и курсор следующей порции.
+    """
+    get_object_or_404(
+        Post.objects.only('id'), id=post_id, author__username=username
+    )
+    comments = comments_page(request, post_id)
+    if request.GET.get('format') == 'json':
+        response = JsonResponse({
+            'comments': [
+                {
+                    'id': comment.id,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created.isoformat(),
+                }
+                for comment in comments
+            ],
+            'next': comments.next_cursor,
+        }, json_dumps_params={'ensure_ascii': False})
+    else:
+        response = render(request, 'includes/comments.html', {
+            'comments': comments,
+            'username': username,
+            'post_id': post_id,
+        })
+    return pagecache.tag(response, f'post:{post_id}')
 
 
 @login_required
@@ -60,7 +174,9 @@ def new_post(request):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        with transaction.atomic():
+            post.save()
+        schedule_thumbnails(post)
         return redirect('index')
     return render(request, 'new.html', {'form': form})
 
@@ -76,7 +192,8 @@ def add_comment(request, username, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('post_view', username=username, post_id=post_id)
 
 
@@ -96,18 +213,29 @@ def post_edit(request, username, post_id):
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            schedule_thumbnails(post)
         return redirect('post_view', username=username, post_id=post_id)
     return render(request, 'new.html', {'form': form, 'post': post, })
 
 
 @login_required
+@condition(etag_func=conditional.follow_etag)
 def follow_index(request):
     user = request.user
-    post_list = Post.objects.filter(author__following__user=user)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'follow.html', {'page': page, })
+    post_list = timeline_posts(user).for_listing()
+    page = paginate(
+        request, post_list, count_tags=['feed', f'follow:{user.pk}']
+    )
+    feed_version, follow_version = cache.versions(
+        'feed', f'follow:{user.pk}'
+    )
+    return render(request, 'follow.html', {
+        'page': page,
+        'feed_version': feed_version,
+        'follow_version': follow_version,
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    })
 
 
 @login_required
@@ -1,10 +1,26 @@
+from django import forms
+from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 
+def reserved_usernames():
+    """Имена, страницы которых перекрыты маршрутами /media/ и /static/."""
+    return {
+        url.strip('/').split('/')[0]
+        for url in (settings.MEDIA_URL, settings.STATIC_URL)
+    }
+
+
 class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+    def clean_username(self):
+        username = self.cleaned_data['username']
+        if username in reserved_usernames():
+            raise forms.ValidationError('Это имя зарезервировано сайтом.')
+        return username
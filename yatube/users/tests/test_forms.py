@@ -0,0 +1,32 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from ..forms import CreationForm, User
+
+
+class CreationFormTests(TestCase):
+    def form(self, username):
+        return CreationForm(data={
+            'username': username,
+            'password1': 'Secret-pass-42',
+            'password2': 'Secret-pass-42',
+        })
+
+    def test_media_and_static_names_are_reserved(self):
+        for username in ('media', 'static'):
+            with self.subTest(username=username):
+                form = self.form(username)
+                self.assertFalse(form.is_valid())
+                self.assertIn('username', form.errors)
+
+    def test_signup_rejects_reserved_name(self):
+        response = self.client.post(reverse('signup'), {
+            'username': 'media',
+            'password1': 'Secret-pass-42',
+            'password2': 'Secret-pass-42',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(User.objects.filter(username='media').exists())
+
+    def test_other_names_are_allowed(self):
+        self.assertTrue(self.form('mediator').is_valid())
@@ -0,0 +1,281 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stats VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_stats SET entries = entries + 1, bytes = bytes + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache BEGIN
+    UPDATE cache_stats SET bytes = bytes + new.size - old.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_stats SET entries = entries - 1, bytes = bytes - old.size;
+END;
+'''
+
+UPSERT = '''
+INSERT INTO cache (key, value, expires, accessed, size)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    value = excluded.value,
+    expires = excluded.expires,
+    accessed = excluded.accessed,
+    size = excluded.size
+'''
+
+# Время последнего обращения для LRU обновляется не чаще раза в секунду,
+# чтобы чтения почти никогда не превращались в запись.
+ACCESS_RESOLUTION = 1.0
+# Ограничение SQLite на число параметров в одном запросе.
+MAX_VARIABLES = 900
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в одном файле SQLite, общий для всех процессов на машине.
+
+    Файл открывается в режиме WAL с отображением в память, поэтому
+    чтения не блокируют друг друга и обходятся без системных вызовов.
+    Размер ограничен ``MAX_ENTRIES`` и ``OPTIONS['MAX_BYTES']``, при
+    переполнении вытесняются давно не читанные ключи. ``add`` - один
+    UPSERT, ``incr`` - транзакция ``BEGIN IMMEDIATE``, так что обе
+    атомарны и между процессами.
+
+    Пример::
+
+        CACHES = {
+            'default': {
+                'BACKEND': 'yatube.cache.SQLiteCache',
+                'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+                'OPTIONS': {'MAX_ENTRIES': 100000, 'MAX_BYTES': 256 << 20},
+            }
+        }
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_bytes = int(options.get('MAX_BYTES', 64 << 20))
+        self._mmap_size = int(options.get('MMAP_SIZE', 256 << 20))
+        self._local = threading.local()
+
+    def _connection(self):
+        # После fork соединение родителя использовать нельзя.
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=10, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            connection.execute(f'PRAGMA mmap_size = {self._mmap_size}')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = pid
+        return self._local.connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    @staticmethod
+    def _dump(value):
+        # Целые числа хранятся как INTEGER, чтобы incr был одним UPDATE.
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    @staticmethod
+    def _size(key, value):
+        return len(key) + (8 if isinstance(value, int) else len(value))
+
+    def _touch_rows(self, connection, rows, now):
+        stale = [
+            (now, key) for key, _, _, accessed in rows
+            if accessed < now - ACCESS_RESOLUTION
+        ]
+        if stale:
+            connection.executemany(
+                'UPDATE cache SET accessed = ? WHERE key = ?', stale
+            )
+
+    def _fetch(self, keys):
+        connection = self._connection()
+        now = time.time()
+        rows = []
+        for start in range(0, len(keys), MAX_VARIABLES):
+            chunk = keys[start:start + MAX_VARIABLES]
+            rows += connection.execute(
+                'SELECT key, value, expires, accessed FROM cache '
+                'WHERE key IN (%s)' % ', '.join('?' * len(chunk)),
+                chunk
+            ).fetchall()
+        live = [row for row in rows if row[2] is None or row[2] > now]
+        if len(live) < len(rows):
+            connection.execute(
+                'DELETE FROM cache WHERE expires <= ?', (now,)
+            )
+        self._touch_rows(connection, live, now)
+        return {key: self._load(value) for key, value, _, _ in live}
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._fetch([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        mapped = {self._key(key, version): key for key in keys}
+        found = self._fetch(list(mapped))
+        return {mapped[key]: value for key, value in found.items()}
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def _rows(self, data, timeout):
+        now = time.time()
+        expires = self._expires(timeout)
+        for key, value in data:
+            value = self._dump(value)
+            yield key, value, expires, now, self._size(key, value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        (row,) = self._rows([(key, value)], timeout)
+        connection.execute(UPSERT, row)
+        self._cull(connection)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = [
+            (self._key(key, version), value) for key, value in data.items()
+        ]
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.executemany(UPSERT, self._rows(items, timeout))
+        self._cull(connection)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        (row,) = self._rows([(key, value)], timeout)
+        cursor = connection.execute(
+            UPSERT + ' WHERE cache.expires IS NOT NULL '
+            'AND cache.expires <= excluded.accessed',
+            row
+        )
+        added = cursor.rowcount > 0
+        if added:
+            self._cull(connection)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            cursor = connection.execute(
+                "UPDATE cache SET value = value + ? WHERE key = ? "
+                "AND typeof(value) = 'integer' "
+                "AND (expires IS NULL OR expires > ?)",
+                (delta, key, time.time())
+            )
+            if not cursor.rowcount:
+                raise ValueError("Key '%s' not found" % key)
+            return connection.execute(
+                'SELECT value FROM cache WHERE key = ?', (key,)
+            ).fetchone()[0]
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self._expires(timeout), key, time.time())
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        self._connection().executemany(
+            'DELETE FROM cache WHERE key = ?',
+            [(self._key(key, version),) for key in keys]
+        )
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def _cull(self, connection):
+        entries, size = connection.execute(
+            'SELECT entries, bytes FROM cache_stats'
+        ).fetchone()
+        if entries <= self._max_entries and size <= self._max_bytes:
+            return
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(
+                'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+            )
+            entries, size = connection.execute(
+                'SELECT entries, bytes FROM cache_stats'
+            ).fetchone()
+            # Как и в других бэкендах Django, за раз вытесняется
+            # 1/CULL_FREQUENCY ключей - самых давно прочитанных.
+            batch = max(1, entries // self._cull_frequency)
+            while entries > self._max_entries or size > self._max_bytes:
+                connection.execute(
+                    'DELETE FROM cache WHERE key IN ('
+                    'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                    (batch,)
+                )
+                entries, size = connection.execute(
+                    'SELECT entries, bytes FROM cache_stats'
+                ).fetchone()
+                if not entries:
+                    break
+
+    def close(self, **kwargs):
+        # Соединение держится на поток всё время жизни процесса: открытие
+        # с PRAGMA и схемой дороже самих операций с кэшем.
+        pass
@@ -0,0 +1,194 @@
+import contextvars
+import heapq
+import json
+import logging
+import random
+from collections import deque
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connections
+from django.http import JsonResponse
+from django.template.base import Template
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('yatube.requests')
+
+SLOWEST_QUERIES = 3
+SQL_PREVIEW = 300
+
+_current = contextvars.ContextVar('request_profile', default=None)
+_missing = object()
+_installed = False
+
+recent = deque(maxlen=settings.REQUEST_PROFILE_BUFFER)
+
+
+class RequestProfile:
+    """Что происходило за один запрос: SQL, шаблоны, кэш."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.slowest = []
+        self.template = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.total = 0.0
+
+    def record_query(self, sql, duration):
+        self.queries += 1
+        self.sql += duration
+        entry = (duration, self.queries, sql)
+        if len(self.slowest) < SLOWEST_QUERIES:
+            heapq.heappush(self.slowest, entry)
+        elif duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.sql * 1000:.1f};desc="{self.queries} queries", '
+            f'tpl;dur={self.template * 1000:.1f}, '
+            f'cache;desc="hit={self.cache_hits} miss={self.cache_misses}", '
+            f'total;dur={self.total * 1000:.1f}'
+        )
+
+    def as_dict(self, request, response):
+        return {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'total_ms': round(self.total * 1000, 2),
+            'queries': self.queries,
+            'sql_ms': round(self.sql * 1000, 2),
+            'template_ms': round(self.template * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'slowest': [
+                {'ms': round(duration * 1000, 2), 'sql': sql[:SQL_PREVIEW]}
+                for duration, _, sql in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+
+def _time_query(execute, sql, params, many, context):
+    profile = _current.get()
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.record_query(sql, perf_counter() - start)
+
+
+def _wrap_template_render(render):
+    def timed_render(template, context):
+        profile = _current.get()
+        if profile is None or profile.template_depth:
+            return render(template, context)
+        profile.template_depth += 1
+        start = perf_counter()
+        try:
+            return render(template, context)
+        finally:
+            profile.template_depth -= 1
+            profile.template += perf_counter() - start
+    return timed_render
+
+
+def _wrap_cache_get(get):
+    def counted_get(cache, key, default=None, version=None):
+        profile = _current.get()
+        if profile is None:
+            return get(cache, key, default, version)
+        value = get(cache, key, _missing, version)
+        if value is _missing:
+            profile.cache_misses += 1
+            return default
+        profile.cache_hits += 1
+        return value
+    return counted_get
+
+
+def _wrap_cache_get_many(get_many):
+    def counted_get_many(cache, keys, version=None):
+        profile = _current.get()
+        if profile is None:
+            return get_many(cache, keys, version)
+        keys = list(keys)
+        found = get_many(cache, keys, version)
+        profile.cache_hits += len(found)
+        profile.cache_misses += len(keys) - len(found)
+        return found
+    return counted_get_many
+
+
+def install():
+    """Один раз оборачивает Template.render и get/get_many бэкендов кэша.
+
+    Вне профилируемого запроса обёртки сводятся к одному чтению
+    contextvar.
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    Template.render = _wrap_template_render(Template.render)
+    for params in settings.CACHES.values():
+        backend = import_string(params['BACKEND'])
+        backend.get = _wrap_cache_get(backend.get)
+        # Базовый get_many сам вызывает get - считать дважды не нужно.
+        if 'get_many' in vars(backend):
+            backend.get_many = _wrap_cache_get_many(backend.get_many)
+
+
+class RequestTimingMiddleware:
+    """Строка лога на каждый запрос и заголовок Server-Timing сотрудникам.
+
+    С вероятностью ``REQUEST_PROFILE_SAMPLE_RATE`` запрос ещё и попадает
+    в кольцевой буфер, который видят сотрудники на /admin/requests/.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+
+    def __call__(self, request):
+        if not settings.REQUEST_TIMING:
+            return self.get_response(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(_time_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        profile.total = perf_counter() - start
+        # Время запросов к базе и кэшу раскрывает устройство сайта, поэтому
+        # заголовок получают только сотрудники. Страницы гостей из кэша
+        # отдаются до аутентификации, и user у запроса может не быть.
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            response['Server-Timing'] = profile.server_timing()
+        sampled = random.random() < settings.REQUEST_PROFILE_SAMPLE_RATE
+        if sampled or logger.isEnabledFor(logging.INFO):
+            record = profile.as_dict(request, response)
+            logger.info(json.dumps(record, ensure_ascii=False))
+            if sampled:
+                recent.append(record)
+        return response
+
+
+@staff_member_required
+def recent_requests(request):
+    return JsonResponse(
+        {'requests': list(reversed(recent))},
+        json_dumps_params={'ensure_ascii': False}
+    )
@@ -0,0 +1,180 @@
+"""Отдача файлов медиа и статики.
+
+Django проверяет путь и наличие файла, а сами байты передаёт фронтовой
+сервер: nginx по ``X-Accel-Redirect``, Apache/lighttpd по ``X-Sendfile``
+(``SENDFILE_BACKEND``). Без фронтового сервера файл отдаёт
+``FileResponse``: WSGI-сервер с ``wsgi.file_wrapper`` (gunicorn)
+передаёт его через sendfile(2), а запросы с Range получают 206.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified
+)
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+X_ACCEL_REDIRECT = 'x-accel-redirect'
+X_SENDFILE = 'x-sendfile'
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """Открытый файл, из которого читается только заданный диапазон.
+
+    ``fileno`` и ``tell`` оставлены, чтобы ``wsgi.file_wrapper`` мог
+    отдать диапазон через sendfile(2) от текущей позиции.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def _hidden(path):
+    # Точечные файлы и недописанные блобы хранилища (.part) не отдаются.
+    return any(
+        part.startswith('.') for part in path.split('/')
+    ) or path.endswith('.part')
+
+
+def _byte_range(header, size):
+    """(начало, длина) из заголовка Range, None - отдать весь файл.
+
+    Несколько диапазонов сразу не поддерживаются: на них, как
+    разрешает RFC 7233, отдаётся весь файл. Невыполнимый диапазон -
+    ``ValueError``.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = min(int(last), size)
+        if not length:
+            raise ValueError(header)
+        return size - length, length
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end - start + 1
+
+
+def _range_applies(request, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    return not if_range or parse_http_date_safe(if_range) == last_modified
+
+
+def _file_response(request, full_path, stat, content_type):
+    size = stat.st_size
+    byte_range = None
+    header = request.META.get('HTTP_RANGE')
+    if header and _range_applies(request, int(stat.st_mtime)):
+        try:
+            byte_range = _byte_range(header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, length = byte_range
+        response = FileResponse(
+            RangeFile(file, start, length), content_type=content_type,
+            status=206
+        )
+        response['Content-Length'] = length
+        response['Content-Range'] = (
+            f'bytes {start}-{start + length - 1}/{size}'
+        )
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _offloaded_response(path, full_path, content_type, internal_prefix):
+    response = HttpResponse(content_type=content_type)
+    # Заголовки - только latin-1, поэтому пути в них закодированы как URL.
+    if settings.SENDFILE_BACKEND == X_ACCEL_REDIRECT:
+        response['X-Accel-Redirect'] = internal_prefix + quote(path)
+    else:
+        response['X-Sendfile'] = quote(full_path)
+    return response
+
+
+def serve(request, path, document_root, internal_prefix):
+    path = posixpath.normpath(path).lstrip('/')
+    if _hidden(path):
+        raise Http404
+    try:
+        full_path = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    if not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'),
+        stat.st_mtime, stat.st_size
+    ):
+        return HttpResponseNotModified()
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    if settings.SENDFILE_BACKEND in (X_ACCEL_REDIRECT, X_SENDFILE):
+        # Range, длину и тело обработает фронтовой сервер.
+        response = _offloaded_response(
+            path, full_path, content_type, internal_prefix
+        )
+    else:
+        response = _file_response(request, full_path, stat, content_type)
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    return serve(
+        request, path, settings.MEDIA_ROOT, settings.SENDFILE_MEDIA_PREFIX
+    )
+
+
+@require_safe
+def serve_static(request, path):
+    return serve(
+        request, path, settings.STATIC_ROOT, settings.SENDFILE_STATIC_PREFIX
+    )
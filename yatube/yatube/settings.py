@@ -1,4 +1,8 @@
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -33,7 +37,9 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'yatube.instrumentation.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'posts.pagecache.AnonymousPageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -120,8 +126,83 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Кэш в файле SQLite общий для всех процессов на машине: версии тегов
+# из posts.cache, сброшенные одним воркером, командой или пулом
+# миниатюр, видны остальным. С LocMemCache у каждого процесса свои
+# версии, и долгие сроки ниже означают устаревшие страницы у соседей.
+# Кэш переживает перезапуск, а тестовая база - нет: прогон тестов получает
+# свой пустой файл, иначе страницы и ленты прошлого прогона отдаются по тем
+# же id.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+CACHE_DIR = BASE_DIR
+if TESTING:
+    CACHE_DIR = tempfile.mkdtemp(prefix='yatube-cache-')
+    atexit.register(shutil.rmtree, CACHE_DIR, True)
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'yatube.cache.SQLiteCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_BYTES': 256 << 20,
+        },
     }
 }
+
+# Посты авторов, у которых подписчиков больше этого числа, не раскладываются
+# по лентам при записи, а домешиваются в /follow/ при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+
+# 'numbered' - ?page=N с номерами страниц, 'cursor' - ?after=/?before= без
+# OFFSET и COUNT(*), для больших таблиц постов.
+POSTS_PAGINATION = 'numbered'
+
+# Фрагменты лент кэшируются под версиями, которые сбрасываются при записи
+# постов, комментариев и подписок, поэтому срок жизни может быть долгим -
+# пока кэш общий для всех процессов (см. CACHES).
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Процессы, в которых строятся миниатюры загруженных картинок; 0 - строить
+# сразу в процессе запроса. Пул включается явно: воркеры форкаются от
+# процесса сервера при первой загрузке, наследуют его настройки и пишут
+# в MEDIA_ROOT уже после ответа. Тесты строят миниатюры сразу.
+THUMBNAIL_WORKERS = 0
+
+# JSON-строка в логгер yatube.requests на каждый запрос и заголовок
+# Server-Timing для сотрудников. По умолчанию только при DEBUG: обёртка
+# каждого SQL-запроса стоит времени. Доля запросов, попадающих в буфер
+# /admin/requests/ (0 - никакие), и размер этого буфера.
+REQUEST_TIMING = DEBUG
+REQUEST_PROFILE_SAMPLE_RATE = 0.0
+REQUEST_PROFILE_BUFFER = 200
+
+# Сколько гостям отдаются из кэша целые страницы лент и постов; они
+# сбрасываются раньше по тегам постов, авторов и групп. 0 - не кэшировать.
+# Работает только с общим для процессов кэшем (см. CACHES): с LocMemCache
+# или DummyCache middleware отключается.
+ANONYMOUS_PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Загрузки сразу пишутся во временный файл, а не держатся в памяти.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Картинки постов при загрузке поворачиваются по EXIF, уменьшаются до
+# POST_IMAGE_MAX_SIZE, лишаются метаданных и перекодируются. Картинки не
+# больше POST_IMAGE_KEEP_BYTES без EXIF и в пределах размера остаются
+# как есть.
+POST_IMAGE_MAX_SIZE = (1920, 1920)
+POST_IMAGE_FORMAT = 'WEBP'
+POST_IMAGE_QUALITY = 82
+POST_IMAGE_KEEP_BYTES = 200 * 1024
+
+# Кто передаёт файлы медиа и статики после проверок в Django:
+# 'x-accel-redirect' (nginx), 'x-sendfile' (Apache, lighttpd) или None -
+# FileResponse с поддержкой Range (только при DEBUG: без DEBUG и бэкенда
+# маршруты /media/ и /static/ не подключаются). Префиксы - internal
+# location nginx, отображённые на MEDIA_ROOT и STATIC_ROOT. Имена
+# пользователей media и static заняты этими маршрутами.
+SENDFILE_BACKEND = None
+SENDFILE_MEDIA_PREFIX = '/protected/media/'
+SENDFILE_STATIC_PREFIX = '/protected/static/'
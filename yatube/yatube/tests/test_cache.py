@@ -0,0 +1,124 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from ..cache import SQLiteCache
+
+
+def increment(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        params = {'OPTIONS': options} if options else {}
+        return SQLiteCache(self.location, params)
+
+    def test_get_set_delete(self):
+        self.cache.set('key', {'a': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'a': [1, 2]})
+        self.cache.set('number', 5)
+        self.assertEqual(self.cache.get('number'), 5)
+        self.cache.set('flag', True)
+        self.assertIs(self.cache.get('flag'), True)
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+
+    def test_shared_between_instances(self):
+        self.cache.set('key', 'value')
+        self.assertEqual(self.make_cache().get('key'), 'value')
+
+    def test_expiry(self):
+        self.cache.set('key', 'value', timeout=-1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertFalse(self.cache.has_key('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_add(self):
+        self.assertTrue(self.cache.add('key', 'first'))
+        self.assertFalse(self.cache.add('key', 'second'))
+        self.assertEqual(self.cache.get('key'), 'first')
+
+    def test_incr(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter'), 2)
+        self.assertEqual(self.cache.decr('counter', 5), -3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=increment, args=(self.location, 100))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 400)
+
+    def test_get_many_set_many(self):
+        self.cache.set_many({'a': 1, 'b': 'two'})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 'two'}
+        )
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+
+    def test_lru_eviction_by_entries(self):
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        connection = cache._connection()
+        for number, key in enumerate(['a', 'b', 'c']):
+            cache.set(key, key)
+            connection.execute(
+                'UPDATE cache SET accessed = ? WHERE key = ?',
+                (number, cache.make_key(key))
+            )
+        cache.get('a')
+        cache.set('d', 'd')
+        self.assertFalse(cache.has_key('b'))
+        self.assertTrue(cache.has_key('a'))
+        self.assertTrue(cache.has_key('d'))
+
+    def test_size_cap(self):
+        cache = self.make_cache(MAX_BYTES=10000)
+        for number in range(20):
+            cache.set(f'key{number}', 'x' * 1000)
+        _, size = cache._connection().execute(
+            'SELECT entries, bytes FROM cache_stats'
+        ).fetchone()
+        self.assertLessEqual(size, 10000)
+        self.assertTrue(cache.has_key('key19'))
+
+    def test_clear(self):
+        self.cache.set('key', 'value')
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('key'))
+
+
+class DefaultCacheTests(SimpleTestCase):
+    def test_default_cache_is_shared_and_bounded(self):
+        # Версии тегов posts.cache должны быть видны всем процессам.
+        self.assertIsInstance(caches['default'], SQLiteCache)
+        self.assertEqual(
+            settings.CACHES['default']['OPTIONS']['MAX_ENTRIES'], 100000
+        )
@@ -0,0 +1,87 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import instrumentation
+
+User = get_user_model()
+
+
+@override_settings(REQUEST_TIMING=True)
+class RequestTimingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(
+            username='staff', password='pass', is_staff=True
+        )
+        cls.user = User.objects.create_user(username='user')
+
+    def setUp(self):
+        cache.clear()
+        instrumentation.recent.clear()
+
+    def test_server_timing_header(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('index'))
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('tpl;dur=', timing)
+        self.assertIn('total;dur=', timing)
+        self.assertRegex(timing, r'desc="[1-9]\d* queries"')
+
+    def test_server_timing_hidden_from_others(self):
+        response = self.client.get(reverse('index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_structured_log(self):
+        with self.assertLogs('yatube.requests', 'INFO') as logs:
+            self.client.get(reverse('index'))
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['path'], reverse('index'))
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertLessEqual(
+            len(record['slowest']), instrumentation.SLOWEST_QUERIES
+        )
+        self.assertGreater(record['cache_misses'], 0)
+
+    def test_cache_hits_counted(self):
+        self.client.get(reverse('index'))
+        with self.assertLogs('yatube.requests', 'INFO') as logs:
+            self.client.get(reverse('index'))
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertGreater(record['cache_hits'], 0)
+
+    @override_settings(REQUEST_TIMING=False)
+    def test_disabled(self):
+        self.client.force_login(self.staff)
+        with self.assertRaises(AssertionError):
+            with self.assertLogs('yatube.requests', 'INFO'):
+                response = self.client.get(reverse('index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_not_sampled_by_default(self):
+        self.client.get(reverse('index'))
+        self.assertEqual(len(instrumentation.recent), 0)
+
+    @override_settings(REQUEST_PROFILE_SAMPLE_RATE=1.0)
+    def test_sampled_requests_shown_to_staff(self):
+        self.client.get(reverse('index'))
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('recent_requests'))
+        self.assertEqual(response.status_code, 200)
+        paths = [item['path'] for item in response.json()['requests']]
+        self.assertEqual(paths[0], reverse('index'))
+
+    def test_buffer_hidden_from_users(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('recent_requests'))
+        self.assertEqual(response.status_code, 302)
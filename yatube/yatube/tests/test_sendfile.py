@@ -0,0 +1,188 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+from urllib.parse import unquote
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, override_settings
+)
+from django.urls import resolve
+
+from .. import sendfile, urls
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CONTENT = bytes(range(256)) * 4
+NAME = 'posts/ab/картинка.png'
+
+# Тесты идут без DEBUG и SENDFILE_BACKEND, и в yatube.urls маршрутов
+# файлов нет: SendfileTests берут их отсюда.
+urlpatterns = [
+    urls.files_url(settings.MEDIA_URL, sendfile.serve_media, 'media'),
+]
+
+
+class StandInProxy:
+    """Заменяет nginx: передаёт запрос в Django и выполняет
+    X-Accel-Redirect по ``internal`` location, как это сделал бы фронт."""
+
+    def __init__(self, client, locations):
+        self.client = client
+        self.locations = locations
+
+    def get(self, path, **headers):
+        response = self.client.get(path, **headers)
+        redirect = response.get('X-Accel-Redirect')
+        if redirect is None:
+            return response, response.status_code, response.content
+        self.assert_empty(response)
+        for prefix, root in self.locations.items():
+            if redirect.startswith(prefix):
+                target = os.path.join(root, unquote(redirect[len(prefix):]))
+                with open(target, 'rb') as file:
+                    return response, 200, file.read()
+        return response, 404, b''
+
+    @staticmethod
+    def assert_empty(response):
+        assert response.content == b'', 'Django не должен отдавать тело'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, ROOT_URLCONF=__name__)
+class SendfileTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts/ab'), exist_ok=True)
+        for name in (NAME, 'posts/ab/blob.gif.part', '.secret'):
+            with open(os.path.join(TEMP_MEDIA_ROOT, name), 'wb') as file:
+                file.write(CONTENT)
+        cls.url = settings.MEDIA_URL + NAME
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    @override_settings(SENDFILE_BACKEND=sendfile.X_ACCEL_REDIRECT)
+    def test_x_accel_redirect_through_proxy(self):
+        proxy = StandInProxy(self.client, {
+            settings.SENDFILE_MEDIA_PREFIX: TEMP_MEDIA_ROOT,
+        })
+        response, status, body = proxy.get(self.url)
+        self.assertEqual(status, 200)
+        self.assertEqual(body, CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('Last-Modified', response)
+
+    @override_settings(SENDFILE_BACKEND=sendfile.X_SENDFILE)
+    def test_x_sendfile(self):
+        response = self.client.get(self.url)
+        self.assertEqual(
+            unquote(response['X-Sendfile']),
+            os.path.join(TEMP_MEDIA_ROOT, NAME)
+        )
+        self.assertEqual(response.content, b'')
+
+    @override_settings(SENDFILE_BACKEND=sendfile.X_ACCEL_REDIRECT)
+    def test_checks_stay_in_django(self):
+        for path in (
+            'posts/ab/missing.png', 'posts/ab/blob.gif.part', '.secret',
+            '../settings.py', 'posts/ab',
+        ):
+            with self.subTest(path=path):
+                response = self.client.get(settings.MEDIA_URL + path)
+                self.assertEqual(response.status_code, 404)
+                self.assertNotIn('X-Accel-Redirect', response)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 405)
+
+    def test_file_response_without_front_server(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_not_modified(self):
+        last_modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_ranges(self):
+        size = len(CONTENT)
+        cases = (
+            ('bytes=10-19', 10, 19),
+            ('bytes=1000-', 1000, size - 1),
+            ('bytes=-24', size - 24, size - 1),
+            ('bytes=1020-5000', 1020, size - 1),
+        )
+        for header, first, last in cases:
+            with self.subTest(header=header):
+                response = self.client.get(self.url, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(
+                    response['Content-Range'], f'bytes {first}-{last}/{size}'
+                )
+                self.assertEqual(
+                    response['Content-Length'], str(last - first + 1)
+                )
+                self.assertEqual(
+                    b''.join(response.streaming_content),
+                    CONTENT[first:last + 1]
+                )
+
+    def test_unsatisfiable_and_ignored_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+        # Несколько диапазонов и устаревший If-Range - весь файл.
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1,5-6')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            self.url, HTTP_RANGE='bytes=0-1',
+            HTTP_IF_RANGE='Wed, 21 Oct 2015 07:28:00 GMT'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_range_goes_to_wsgi_file_wrapper(self):
+        environ = RequestFactory().get(
+            self.url, HTTP_RANGE='bytes=4-7'
+        ).environ
+        # Как от настоящего WSGI-сервера: байты пути в виде latin-1.
+        environ['PATH_INFO'] = self.url.encode().decode('iso-8859-1')
+        environ['wsgi.file_wrapper'] = FileWrapper
+        start_response = mock.Mock()
+        result = WSGIHandler()(environ, start_response)
+        try:
+            self.assertIsInstance(result, FileWrapper)
+            self.assertIsInstance(result.filelike, sendfile.RangeFile)
+            # sendfile(2) начнёт с текущей позиции открытого файла.
+            self.assertEqual(result.filelike.tell(), 4)
+            self.assertEqual(b''.join(result), CONTENT[4:8])
+        finally:
+            result.close()
+        status, _ = start_response.call_args[0]
+        self.assertEqual(status, '206 Partial Content')
+
+
+class FilesUrlsTests(SimpleTestCase):
+    @override_settings(DEBUG=False, SENDFILE_BACKEND=None)
+    def test_not_mounted_without_front_server(self):
+        self.assertEqual(urls.files_urls(), [])
+
+    @override_settings(DEBUG=False, SENDFILE_BACKEND=sendfile.X_SENDFILE)
+    def test_mounted_with_sendfile_backend(self):
+        self.assertEqual(
+            [pattern.name for pattern in urls.files_urls()],
+            ['media', 'static']
+        )
+
+    def test_unmounted_prefixes_reach_profiles(self):
+        self.assertEqual(resolve('/media/5/').url_name, 'post_view')
+        self.assertEqual(resolve('/static/').url_name, 'profile')
@@ -1,24 +1,43 @@
+import re
+
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.conf.urls import handler404, handler500
 from django.conf import settings
-from django.conf.urls.static import static
+
+from .instrumentation import recent_requests
+from .sendfile import serve_media, serve_static
 
 handler404 = 'posts.views.page_not_found'  # noqa
 handler500 = 'posts.views.server_error'  # noqa
 
-urlpatterns = [
+
+def files_url(prefix, view, name):
+    return re_path(
+        r'^%s(?P<path>.+)$' % re.escape(prefix.lstrip('/')), view, name=name
+    )
+
+
+def files_urls():
+    """Маршруты медиа и статики - при DEBUG или заданном SENDFILE_BACKEND.
+
+    Без них /media/ и /static/ отдаёт фронтовой сервер, и Django их не
+    видит. Когда маршруты есть, они перекрывают страницы пользователей
+    с такими именами, поэтому эти имена заняты (см. users.forms).
+    """
+    if not (settings.DEBUG or settings.SENDFILE_BACKEND):
+        return []
+    return [
+        files_url(settings.MEDIA_URL, serve_media, 'media'),
+        files_url(settings.STATIC_URL, serve_static, 'static'),
+    ]
+
+
+urlpatterns = files_urls() + [
     path('', include('posts.urls')),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
+    path('admin/requests/', recent_requests, name='recent_requests'),
     path('admin/', admin.site.urls),
     path('about/', include('about.urls', namespace='about')),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
-    urlpatterns += static(
-        settings.STATIC_URL, document_root=settings.STATIC_ROOT
-    )